@@ -0,0 +1,85 @@
+"""
+Static asset URLs and precompressed serving
+Templates call asset_url("js/app.js") and get the content-hashed file from the build
+manifest (see app/build_assets.py), so /static/* can be cached as immutable.
+Without a build the URL falls back to the source file with a content-hash query string.
+"""
+import os
+import json
+import hashlib
+import mimetypes
+from functools import lru_cache
+from fastapi.staticfiles import StaticFiles
+from starlette.responses import FileResponse
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST_PATH = os.path.join(DIST_DIR, "manifest.json")
+STATIC_URL = "/static/"
+
+# Precompressed variants the build writes next to each asset, best first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _load_manifest() -> dict:
+    try:
+        with open(MANIFEST_PATH) as f:
+            manifest = json.load(f)
+        print(f"✓ Loaded asset manifest ({len(manifest)} assets)")
+        return manifest
+    except FileNotFoundError:
+        print("⚠ No asset manifest - run `python -m app.build_assets` for hashed, minified assets")
+        return {}
+    except Exception as e:
+        print(f"⚠ Failed to load asset manifest: {e}")
+        return {}
+
+
+MANIFEST = _load_manifest()
+
+
+@lru_cache(maxsize=None)
+def _source_hash(path: str) -> str:
+    try:
+        with open(os.path.join(STATIC_DIR, path), "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()[:8]
+    except OSError:
+        return ""
+
+
+def asset_url(path: str) -> str:
+    """URL of a static asset, e.g. asset_url("css/styles.css")"""
+    path = path.lstrip("/")
+    if path in MANIFEST:
+        return STATIC_URL + MANIFEST[path]
+    version = _source_hash(path)
+    return f"{STATIC_URL}{path}?v={version}" if version else STATIC_URL + path
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves the build's .br / .gz variants when the client accepts them"""
+
+    async def get_response(self, path: str, scope):
+        accepted = ""
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accepted = value.decode("latin-1")
+                break
+
+        headers = {}
+        if path.startswith("dist/"):
+            headers["Cache-Control"] = "public, max-age=31536000, immutable"
+
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = self.lookup_path(path + suffix)
+            if stat_result is None:
+                continue
+            media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            return FileResponse(full_path, stat_result=stat_result, media_type=media_type,
+                                headers={**headers, "Content-Encoding": encoding, "Vary": "Accept-Encoding"})
+
+        response = await super().get_response(path, scope)
+        response.headers.update(headers)
+        return response
@@ -0,0 +1,213 @@
+"""
+Static asset build: minify, content-hash and precompress app/static
+
+    python -m app.build_assets
+
+Writes app/static/dist/<dir>/<name>.<hash>.<ext> plus .gz (and .br when the brotli
+package is installed) variants, and dist/manifest.json mapping source paths to hashed
+ones for asset_url() in the templates. Run it before deploying.
+"""
+import os
+import re
+import gzip
+import json
+import shutil
+import hashlib
+from app.assets import STATIC_DIR, DIST_DIR, MANIFEST_PATH
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BUILD_EXTENSIONS = (".js", ".css")
+HASH_LENGTH = 10
+
+
+# ==================== MINIFIERS ====================
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_CSS_SPACES = re.compile(r"\s+")
+_CSS_PUNCTUATION = re.compile(r"\s*([{};,>])\s*")
+
+
+def minify_css(source: str) -> str:
+    css = _CSS_COMMENT.sub("", source)
+    css = _CSS_SPACES.sub(" ", css)
+    css = _CSS_PUNCTUATION.sub(r"\1", css)
+    css = css.replace(";}", "}")
+    return css.strip()
+
+
+# A "/" after one of these starts a regex literal, otherwise it's division
+_REGEX_PREFIX = set("(,=:[!&|?{};+-*%<>~^")
+
+
+def _skip_literal(source: str, i: int, quote: str) -> int:
+    """Index just past the string or regex literal starting at i"""
+    n = len(source)
+    i += 1
+    in_class = False
+    while i < n:
+        c = source[i]
+        if c == "\\":
+            i += 2
+            continue
+        if quote == "/":
+            if c == "[":
+                in_class = True
+            elif c == "]":
+                in_class = False
+            elif c == "/" and not in_class:
+                i += 1
+                while i < n and source[i].isalpha():
+                    i += 1
+                return i
+        elif c == quote:
+            return i + 1
+        i += 1
+    return n
+
+
+def _minify_code(source: str, i: int, out: list, in_template: bool = False) -> int:
+    """
+    Copy code from i into out without comments and indentation
+    Inside a template literal's ${...} stops at the matching brace; returns the index reached
+    """
+    n = len(source)
+    depth = 0
+    last_significant = ""
+    while i < n:
+        char = source[i]
+        ahead = source[i + 1] if i + 1 < n else ""
+
+        if char == "/" and ahead == "/":
+            while i < n and source[i] != "\n":
+                i += 1
+            continue
+        if char == "/" and ahead == "*":
+            end = source.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            continue
+
+        if char == "`":
+            i = _copy_template(source, i, out)
+            last_significant = "`"
+            continue
+        if char in "'\"" or (char == "/" and (last_significant in _REGEX_PREFIX or not last_significant)):
+            end = _skip_literal(source, i, char)
+            out.append(source[i:end])
+            last_significant = source[end - 1]
+            i = end
+            continue
+
+        if in_template:
+            if char == "{":
+                depth += 1
+            elif char == "}":
+                if depth == 0:
+                    return i
+                depth -= 1
+
+        if char == "\n":
+            out.append("\n")
+            i += 1
+            while i < n and source[i] in " \t\r\n":
+                i += 1
+            continue
+
+        out.append(char)
+        if not char.isspace():
+            last_significant = char
+        i += 1
+    return i
+
+
+def _copy_template(source: str, i: int, out: list) -> int:
+    """Copy a template literal verbatim, minifying only the code inside ${...}"""
+    n = len(source)
+    out.append("`")
+    i += 1
+    while i < n:
+        c = source[i]
+        if c == "\\":
+            out.append(source[i:i + 2])
+            i += 2
+            continue
+        if c == "`":
+            out.append("`")
+            return i + 1
+        if c == "$" and i + 1 < n and source[i + 1] == "{":
+            out.append("${")
+            i = _minify_code(source, i + 2, out, in_template=True)
+            out.append("}")
+            i += 1
+            continue
+        out.append(c)
+        i += 1
+    return n
+
+
+def minify_js(source: str) -> str:
+    """
+    Conservative JS minifier: drops comments, indentation and blank lines
+    Strings, template literals and regex literals are copied untouched and line breaks
+    are kept, so automatic semicolon insertion behaves exactly as in the source
+    """
+    out = []
+    _minify_code(source, 0, out)
+    lines = (line.rstrip() for line in "".join(out).split("\n"))
+    return "\n".join(line for line in lines if line).strip() + "\n"
+
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+
+# ==================== BUILD ====================
+def _write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def build_asset(relative_path: str) -> str:
+    """Minify, hash and compress one asset; returns its path relative to /static/"""
+    name, ext = os.path.splitext(relative_path)
+    with open(os.path.join(STATIC_DIR, relative_path), encoding="utf-8") as f:
+        source = f.read()
+
+    data = MINIFIERS[ext](source).encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    hashed_path = f"dist/{name}.{digest}{ext}"
+    output = os.path.join(STATIC_DIR, hashed_path)
+
+    _write(output, data)
+    _write(output + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli:
+        _write(output + ".br", brotli.compress(data, quality=11))
+
+    print(f"   {relative_path} -> {hashed_path} ({len(source.encode('utf-8'))} -> {len(data)} bytes)")
+    return hashed_path
+
+
+def build():
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+
+    manifest = {}
+    for root, dirs, files in os.walk(STATIC_DIR):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != DIST_DIR)
+        for filename in sorted(files):
+            if not filename.endswith(BUILD_EXTENSIONS):
+                continue
+            relative_path = os.path.relpath(os.path.join(root, filename), STATIC_DIR).replace(os.sep, "/")
+            manifest[relative_path] = build_asset(relative_path)
+
+    _write(MANIFEST_PATH, json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+    print(f"✓ Built {len(manifest)} assets into {DIST_DIR}")
+    if not brotli:
+        print("⚠ brotli not installed - only gzip variants were written")
+    return manifest
+
+
+if __name__ == "__main__":
+    build()
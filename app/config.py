@@ -19,6 +19,82 @@ GROQ_MODELS = [
     "gemma2-9b-it",             # Alternative fallback
 ]
 
+# ==================== MODEL ROUTING ====================
+# LLM_PROVIDER=mock swaps Groq for a local offline fake (see services/mock_llm.py)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq").strip().lower()
+ROUTER_EWMA_ALPHA = 0.3           # Weight of the newest sample in rolling stats
+ROUTER_DEFAULT_LATENCY = 5.0      # Assumed latency (s) for a model with no samples yet
+BREAKER_FAILURE_THRESHOLD = 3     # Consecutive failures before a model's breaker opens
+BREAKER_COOLDOWN_SECONDS = 60     # How long an open breaker skips the model before a probe
+
+# ==================== AUDIT EXECUTION ====================
+# "single" = one monolithic prompt, "parallel" = independent section prompts run concurrently
+AUDIT_MODE = os.getenv("AUDIT_MODE", "single").strip().lower()
+PARALLEL_SECTION_RETRIES = 1  # Extra attempts for a failed section in parallel mode
+RETRY_PAUSE_SECONDS = 1.0     # Pause before retrying a failed model call (0 when replaying)
+
+# ==================== REQUEST DEADLINES ====================
+# Time budget of one /api/audit (or re-audit) request - credit lookup, model calls, retries and saving included
+AUDIT_DEADLINE_SECONDS = float(os.getenv("AUDIT_DEADLINE_SECONDS", "55"))
+MIN_LLM_ATTEMPT_SECONDS = 3.0   # Don't start a model call with less time than this left
+LLM_CALL_TIMEOUT_SECONDS = 25.0 # Max for one model call, so a hung model leaves time for the fallbacks
+DB_WRITE_RESERVE_SECONDS = 2.0  # Kept back from the model calls for saving the audit + deducting the credit
+
+# ==================== LLM USAGE ACCOUNTING ====================
+# USD per 1M (input, output) tokens
+MODEL_PRICING = {
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+    "llama-3.1-8b-instant": (0.05, 0.08),
+    "gemma2-9b-it": (0.20, 0.20),
+}
+USAGE_FLUSH_INTERVAL = 60  # Seconds between bulk writes of aggregated usage to llm_usage (write-behind only - otherwise per audit)
+# Daily token budget per plan, e.g. PLAN_TOKEN_BUDGETS="free=20000,pro=500000" (unset/0 = unlimited)
+# Shared across instances through llm_usage, which each one re-reads every USAGE_FLUSH_INTERVAL -
+# concurrent workers can overshoot a budget by about one flush interval of usage
+PLAN_TOKEN_BUDGETS = {
+    plan.strip(): int(limit)
+    for plan, limit in (item.split("=", 1) for item in os.getenv("PLAN_TOKEN_BUDGETS", "").split(",") if "=" in item)
+}
+# Comma-separated emails allowed to use /api/admin/* endpoints
+ADMIN_EMAILS = {e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()}
+
+# ==================== LLM RECORDING ====================
+# Set LLM_RECORD_DIR to capture anonymized inputs + raw model responses for offline replay (app/replay.py)
+LLM_RECORD_DIR = os.getenv("LLM_RECORD_DIR", "")
+LLM_RECORD_SAMPLE_RATE = float(os.getenv("LLM_RECORD_SAMPLE_RATE", "1.0"))  # Fraction of audits recorded
+
+# ==================== GUEST PREVIEW CACHE ====================
+# Near-duplicate guest submissions reuse a recent audit instead of calling the LLM
+SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.85"))  # Estimated Jaccard similarity
+SIMILARITY_CACHE_SIZE = 500          # Max cached audits held in memory
+SIMILARITY_CACHE_TTL = 6 * 3600      # Seconds a cached audit stays reusable
+
+# ==================== SELF-HOSTED SERVER ====================
+# Set by `python -m app.serve` (multi-worker uvicorn); unset on Vercel
+SELF_HOSTED = os.getenv("SELF_HOSTED", "").strip().lower() in ("1", "true", "yes")
+SERVER_WORKERS = int(os.getenv("WEB_CONCURRENCY", "0"))         # 0 = one per CPU core
+SERVER_THREADS = int(os.getenv("SERVER_THREADS", "64"))          # Threads for blocking Supabase/Groq calls, per worker
+GRACEFUL_SHUTDOWN_SECONDS = int(os.getenv("GRACEFUL_SHUTDOWN_SECONDS", "30"))  # In-flight requests get this long to finish
+
+# ==================== WRITE-BEHIND INSERTS ====================
+# audit_history / llm_usage rows are queued and inserted in bulk off the request path
+# Self-hosted only: a frozen or recycled lambda never runs the flush thread or the shutdown hook,
+# so on Vercel every row is written before the response returns
+WRITE_BEHIND_ENABLED = SELF_HOSTED and \
+    os.getenv("WRITE_BEHIND_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+WRITE_BEHIND_BATCH_SIZE = 50       # Flush as soon as a table has this many rows queued
+WRITE_BEHIND_FLUSH_INTERVAL = 2.0  # ...or after this many seconds
+WRITE_BEHIND_MAX_RETRIES = 3       # Failed inserts of a row before it's dropped
+
+# ==================== ACCOUNT CACHE / UPSTREAM HEALTH ====================
+# Last-known-good subscription + recent audits, served stale while Supabase is slow
+ACCOUNT_CACHE_FRESH_SECONDS = 30     # Served without a refresh for this long
+ACCOUNT_CACHE_MAX_STALE = 24 * 3600  # Never served older than this
+ACCOUNT_CACHE_MAX_ENTRIES = 10000    # Least recently used entries are evicted beyond this
+UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", "1.5"))  # Max wait when nothing usable is cached
+HEALTH_CHECK_INTERVAL = 30           # /health re-probes Supabase at most this often
+UPSTREAM_SLOW_MS = 1000              # Average latency above this reports "degraded"
+
 # ==================== SEO CONFIGURATION ====================
 SEO_CONFIG = {
     "home": {
@@ -1,4 +1,5 @@
 from supabase import create_client, Client
+from postgrest.exceptions import APIError
 from app.config import SUPABASE_URL, SUPABASE_KEY
 
 # ==================== INITIALIZE SUPABASE ====================
@@ -28,6 +29,36 @@ def get_current_user(access_token: str):
 
 
 # ==================== SUBSCRIPTION HELPER ====================
+# Postgres: no unique constraint matches the ON CONFLICT target
+MISSING_CONSTRAINT = "42P10"
+
+# Cleared the first time the upsert fails for lack of the user_id unique constraint
+_upsert_supported = True
+
+
+def _create_subscription(new_subscription: dict):
+    """
+    Insert a subscription row, idempotently when user_subscriptions.user_id is unique
+    Falls back to a plain insert (and says so loudly) when the constraint is missing
+    """
+    global _upsert_supported
+    if _upsert_supported:
+        try:
+            # Upsert so a concurrent provisioning (e.g. deferred login task + dashboard load)
+            # can't create a second row
+            return supabase.table("user_subscriptions")\
+                .upsert(new_subscription, on_conflict="user_id", ignore_duplicates=True)\
+                .execute()
+        except APIError as e:
+            if e.code != MISSING_CONSTRAINT:
+                raise
+            _upsert_supported = False
+            print("❌ user_subscriptions.user_id has no unique constraint - concurrent signups can create "
+                  "duplicate subscriptions. Add it (see README); using plain inserts until then")
+    
+    return supabase.table("user_subscriptions").insert(new_subscription).execute()
+
+
 def ensure_user_subscription(user_id: str, email: str = None) -> dict:
     """
     Ensure user has a subscription record
@@ -70,11 +101,20 @@ def ensure_user_subscription(user_id: str, email: str = None) -> dict:
                 "audits_remaining": 1
             }
             
-            result = supabase.table("user_subscriptions").insert(new_subscription).execute()
+            result = _create_subscription(new_subscription)
             
             if result.data and len(result.data) > 0:
                 print(f"✓ Created subscription for user {user_id}")
                 return result.data[0]
+            
+            # Someone else created it first - return theirs
+            existing = supabase.table("user_subscriptions")\
+                .select("*")\
+                .eq("user_id", user_id)\
+                .execute()
+            if existing.data:
+                print(f"✓ Subscription was created concurrently for user {user_id}")
+                return existing.data[0]
             else:
                 print(f"❌ Failed to create subscription - no data returned")
                 return None
@@ -0,0 +1,99 @@
+"""
+Startup warm-up and graceful drain of the long-lived clients
+The Supabase, Groq and Gumroad clients are created once per process at import
+(the Vercel lambda needs them that way too). On a self-hosted server the lifespan
+opens their connections and compiles the templates before the first request, and on
+shutdown flushes everything buffered in memory before closing the connections.
+"""
+import time
+import asyncio
+import anyio.to_thread
+from concurrent.futures import ThreadPoolExecutor
+from app.config import SERVER_THREADS, GUMROAD_ACCESS_TOKEN
+from app.database import supabase
+from app.services import audit_service, account_cache
+from app.services.license_service import gumroad_session, GUMROAD_VERIFY_URL
+from app.services.usage_tracker import usage_tracker
+from app.services.write_buffer import write_buffer
+
+DRAIN_TASK_TIMEOUT = 5.0   # Max wait for background refreshes still running at shutdown
+
+
+# ==================== WARM-UP ====================
+def _warm_supabase():
+    supabase.table("user_subscriptions").select("user_id").limit(1).execute()
+
+
+def _warm_groq():
+    # Authenticated but free - opens the TLS connection the first audit will reuse
+    audit_service.groq_client.models.list()
+
+
+def _warm_gumroad():
+    gumroad_session.head(GUMROAD_VERIFY_URL, timeout=5)
+
+
+def warm_templates(env) -> int:
+    """Compile every template now, and stop checking their mtimes on each render"""
+    env.auto_reload = False
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
+async def warm_up(templates_env):
+    # asyncio.to_thread uses the loop's executor; sync routes and streamed exports use anyio's pool
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=SERVER_THREADS, thread_name_prefix="blocking")
+    )
+    anyio.to_thread.current_default_thread_limiter().total_tokens = SERVER_THREADS
+    print(f"✓ Compiled {warm_templates(templates_env)} templates")
+
+    checks = {}
+    if supabase:
+        checks["supabase"] = _warm_supabase
+    if audit_service.groq_client is not None and hasattr(audit_service.groq_client, "models"):
+        checks["groq"] = _warm_groq
+    if GUMROAD_ACCESS_TOKEN:
+        checks["gumroad"] = _warm_gumroad
+
+    # Timed through account_cache so /health has upstream latency from the start
+    results = await asyncio.gather(
+        *(account_cache.timed_call(name, check) for name, check in checks.items()),
+        return_exceptions=True
+    )
+    for name, result in zip(checks, results):
+        if isinstance(result, Exception):
+            print(f"⚠ Warm-up of {name} failed: {result}")
+        else:
+            print(f"✓ {name} connection warm")
+
+
+# ==================== DRAIN ====================
+async def drain():
+    """Flush buffered writes and close connections - runs after the server stopped taking requests"""
+    started = time.monotonic()
+
+    pending = account_cache.background_tasks()
+    if pending:
+        print(f"⏳ Waiting for {len(pending)} background tasks")
+        await asyncio.wait(pending, timeout=DRAIN_TASK_TIMEOUT)
+
+    # Don't lose queued audit_history / llm_usage rows
+    usage_tracker.flush()
+    await asyncio.to_thread(write_buffer.shutdown)
+
+    for name, close in (
+        ("groq", getattr(audit_service.groq_client, "close", None)),
+        ("supabase", supabase.postgrest.aclose if supabase else None),
+        ("gumroad", gumroad_session.close)
+    ):
+        if close is None:
+            continue
+        try:
+            close()
+        except Exception as e:
+            print(f"⚠ Failed to close {name} client: {e}")
+
+    print(f"✓ Drained in {time.monotonic() - started:.1f}s")
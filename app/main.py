@@ -1,21 +1,44 @@
-from fastapi import FastAPI, Request, Form, Depends, Cookie
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, Request, Form, Depends, Cookie, BackgroundTasks
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from datetime import datetime
+from contextlib import asynccontextmanager
+import asyncio
+
+from app.config import SEO_CONFIG, GUMROAD_PRODUCT_URL, UPSTREAM_SLOW_MS, ADMIN_EMAILS, SELF_HOSTED, \
+    AUDIT_DEADLINE_SECONDS
+from app.database import get_current_user, supabase
+from app.services import auth_service, license_service, audit_service, analytics_service, account_cache, \
+    export_service, deadline
+from app.services.seo_index import score_title
+from app.services.write_buffer import write_buffer
+from app.services.model_router import model_router
+from app.services.usage_tracker import usage_tracker, persisted_summary
+from app.assets import PrecompressedStaticFiles, asset_url
+from app.responses import FastJSONResponse, SecurityHeadersMiddleware
+from app import lifecycle
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if SELF_HOSTED:
+        await lifecycle.warm_up(templates.env)
+    yield
+    await lifecycle.drain()
 
-from app.config import SEO_CONFIG, GUMROAD_PRODUCT_URL
-from app.database import get_current_user, ensure_user_subscription, supabase
-from app.services import auth_service, license_service, audit_service
 
 # Initialize FastAPI
-app = FastAPI(title="OccupancyOS - Airbnb Listing Optimizer")
+app = FastAPI(title="OccupancyOS - Airbnb Listing Optimizer", lifespan=lifespan)
+if SELF_HOSTED:
+    app.add_middleware(SecurityHeadersMiddleware)  # Vercel adds these from vercel.json
 
 # Mount static files and templates
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+app.mount("/static", PrecompressedStaticFiles(directory="app/static"), name="static")
 templates = Jinja2Templates(directory="app/templates")
+templates.env.globals["asset_url"] = asset_url  # Hashed /static URLs from the build manifest
 
 BASE_URL = "https://occupancy-os.vercel.app"
+DEADLINE_MESSAGE = "The analysis took too long and was stopped - you weren't charged. Please try again."
 
 
 # ==================== AUTH DEPENDENCY ====================
@@ -59,20 +82,15 @@ async def dashboard(request: Request, user=Depends(get_user_from_cookie)):
 
     subscription_data = None
     audits_data = []
+    stale = False
 
     if supabase:
-        subscription_data = ensure_user_subscription(user.id, user.email)
-
-        try:
-            audits = supabase.table("audit_history")\
-                .select("*")\
-                .eq("user_id", user.id)\
-                .order("created_at", desc=True)\
-                .limit(10)\
-                .execute()
-            audits_data = audits.data if audits.data else []
-        except Exception as e:
-            print(f"Failed to fetch audits: {e}")
+        # Both come from the last-known-good cache - a slow database can't hang the page
+        (subscription_data, subscription_stale), (audits_data, audits_stale) = await asyncio.gather(
+            account_cache.get_subscription(user.id, user.email),
+            account_cache.get_recent_audits(user.id)
+        )
+        stale = subscription_stale or audits_stale
 
     return templates.TemplateResponse("dashboard.html", {
         "request": request,
@@ -80,6 +98,7 @@ async def dashboard(request: Request, user=Depends(get_user_from_cookie)):
         "user": user,
         "subscription": subscription_data,
         "audits": audits_data,
+        "stale": stale,
         "gumroad_url": GUMROAD_PRODUCT_URL,
         "current_year": datetime.now().year
     })
@@ -89,9 +108,10 @@ async def dashboard(request: Request, user=Depends(get_user_from_cookie)):
 async def audit_page(request: Request, user=Depends(get_user_from_cookie)):
     audits_remaining = None
     plan = "free"
+    stale = False
 
     if user and supabase:
-        subscription = ensure_user_subscription(user.id, user.email)
+        subscription, stale = await account_cache.get_subscription(user.id, user.email)
         if subscription:
             audits_remaining = subscription.get("audits_remaining")
             plan = subscription.get("plan", "free")
@@ -102,6 +122,7 @@ async def audit_page(request: Request, user=Depends(get_user_from_cookie)):
         "user": user,
         "audits_remaining": audits_remaining,
         "plan": plan,
+        "stale": stale,
         "gumroad_url": GUMROAD_PRODUCT_URL,
         "current_year": datetime.now().year
     })
@@ -137,7 +158,8 @@ async def privacy_page(request: Request):
 
 # ==================== API ROUTES ====================
 @app.post("/api/signup")
-async def signup(request: Request, email: str = Form(...), password: str = Form(...), tos_accepted: str = Form(None)):
+async def signup(request: Request, background_tasks: BackgroundTasks, email: str = Form(...), password: str = Form(...),
+                 tos_accepted: str = Form(None)):
     try:
         tos_bool = tos_accepted in ("on", "true")
         if not tos_bool:
@@ -148,7 +170,7 @@ async def signup(request: Request, email: str = Form(...), password: str = Form(
         if forwarded:
             client_ip = forwarded.split(",")[0].strip()
 
-        result = await auth_service.signup_user(email, password, tos_bool, client_ip)
+        result = await auth_service.signup_user(email, password, tos_bool, client_ip, background_tasks)
         return JSONResponse(result)
 
     except Exception as e:
@@ -156,9 +178,9 @@ async def signup(request: Request, email: str = Form(...), password: str = Form(
 
 
 @app.post("/api/login")
-async def login(email: str = Form(...), password: str = Form(...)):
+async def login(background_tasks: BackgroundTasks, email: str = Form(...), password: str = Form(...)):
     try:
-        token = await auth_service.login_user(email, password)
+        token = await auth_service.login_user(email, password, background_tasks)
         response = JSONResponse({"success": True, "redirect": "/dashboard"})
         response.set_cookie("access_token", token, httponly=True, samesite="lax", max_age=3600 * 24 * 7)
         return response
@@ -188,9 +210,131 @@ async def redeem_license(license_key: str = Form(...), user=Depends(get_user_fro
 @app.post("/api/audit")
 async def audit(request: Request, title: str = Form(...), description: str = Form(...), property_type: str = Form(...),
                 target_audience: str = Form("All Audiences"), amenities: str = Form(""), user=Depends(get_user_from_cookie)):
+    budget = deadline.begin(AUDIT_DEADLINE_SECONDS)
     try:
         result = await audit_service.analyze_listing(title, description, property_type, target_audience, amenities, user.id if user else None)
-        return JSONResponse(result)
+        return FastJSONResponse(result)
+    except deadline.DeadlineExceededError:
+        return JSONResponse({"error": DEADLINE_MESSAGE, "timeout": True}, status_code=504)
+    except audit_service.TokenBudgetError as e:
+        return JSONResponse({"error": str(e)}, status_code=429)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+    finally:
+        deadline.end(budget)
+
+
+@app.get("/api/seo/title-score")
+async def title_score(title: str = "", description: str = ""):
+    # Local keyword index only - cheap enough to call on every keystroke
+    return JSONResponse(score_title(title[:200], description[:5000]))
+
+
+@app.get("/api/audits/export")
+async def export_audits(format: str = "csv", user=Depends(get_user_from_cookie)):
+    if not user:
+        return JSONResponse({"error": "Please log in", "login_required": True}, status_code=401)
+    if format not in export_service.FORMATS:
+        return JSONResponse({"error": f"Unknown format '{format}'. Use csv or jsonl"}, status_code=400)
+    if not supabase:
+        return JSONResponse({"error": "Service not configured"}, status_code=500)
+
+    # Sync generator - Starlette iterates it in a worker thread, one page per chunk
+    return StreamingResponse(
+        export_service.stream_export(user.id, format),
+        media_type=export_service.FORMATS[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{export_service.export_filename(format)}"',
+            "Cache-Control": "no-store"
+        }
+    )
+
+
+@app.get("/api/audits/{audit_id}")
+async def get_audit(audit_id: str, user=Depends(get_user_from_cookie)):
+    if not user:
+        return JSONResponse({"error": "Please log in", "login_required": True}, status_code=401)
+
+    try:
+        result = await audit_service.get_audit(audit_id, user.id)
+        if not result:
+            return JSONResponse({"error": "Audit not found"}, status_code=404)
+        return FastJSONResponse(result)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@app.post("/api/audits/{audit_id}/reaudit")
+async def reaudit(audit_id: str, field: str = Form(...), value: str = Form(""), user=Depends(get_user_from_cookie)):
+    if not user:
+        return JSONResponse({"error": "Please log in", "login_required": True}, status_code=401)
+
+    budget = deadline.begin(AUDIT_DEADLINE_SECONDS)
+    try:
+        result = await audit_service.reaudit_listing(audit_id, user.id, field, value)
+        if not result:
+            return JSONResponse({"error": "Audit not found"}, status_code=404)
+        return FastJSONResponse(result)
+    except audit_service.ValidationError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except deadline.DeadlineExceededError:
+        return JSONResponse({"error": DEADLINE_MESSAGE, "timeout": True}, status_code=504)
+    except audit_service.TokenBudgetError as e:
+        return JSONResponse({"error": str(e)}, status_code=429)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+    finally:
+        deadline.end(budget)
+
+
+# ==================== ANALYTICS ROUTES ====================
+@app.get("/api/analytics/score-trends")
+async def score_trends(period: str = "week", days: int = 90, property_type: str = None,
+                       user=Depends(get_user_from_cookie)):
+    if not user:
+        return JSONResponse({"error": "Please log in", "login_required": True}, status_code=401)
+
+    try:
+        days = max(1, min(days, 730))
+        trends = await asyncio.to_thread(analytics_service.get_score_trends, user.id, period, days, property_type)
+        return JSONResponse(trends)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@app.post("/api/analytics/rebuild")
+async def rebuild_analytics(user=Depends(get_user_from_cookie)):
+    if not user:
+        return JSONResponse({"error": "Please log in", "login_required": True}, status_code=401)
+
+    try:
+        # Pending audits would be counted twice once their flush hook runs
+        await asyncio.to_thread(write_buffer.flush)
+        audits = await asyncio.to_thread(analytics_service.rebuild_rollups, user.id)
+        return JSONResponse({"success": True, "audits_counted": audits})
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+# ==================== ADMIN ROUTES ====================
+@app.get("/api/admin/usage")
+async def llm_usage(days: int = 7, user=Depends(get_user_from_cookie)):
+    if not user:
+        return JSONResponse({"error": "Please log in", "login_required": True}, status_code=401)
+    if (user.email or "").lower() not in ADMIN_EMAILS:
+        return JSONResponse({"error": "Not allowed"}, status_code=403)
+
+    try:
+        # Persist this instance's pending deltas first so the totals include them
+        await asyncio.to_thread(usage_tracker.flush)
+        await asyncio.to_thread(write_buffer.flush)
+        days = max(1, min(days, 90))
+        return JSONResponse({
+            "this_instance": usage_tracker.summary(),
+            "persisted": await asyncio.to_thread(persisted_summary, days)
+        })
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
@@ -233,4 +377,16 @@ Sitemap: {BASE_URL}/sitemap.xml
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
+    # Cached measurements only - a slow dependency can't make the health check slow
+    dependencies = await account_cache.dependency_health()
+    degraded = any(
+        stats and (not stats["ok"] or (stats["ewma_ms"] or 0) > UPSTREAM_SLOW_MS)
+        for stats in dependencies.values()
+    )
+    return {
+        "status": "degraded" if degraded else "healthy",
+        "dependencies": dependencies,
+        "llm_models": model_router.snapshot(),
+        "write_buffer": write_buffer.stats(),
+        "account_cache": account_cache.account_cache.stats()
+    }
@@ -0,0 +1,252 @@
+"""
+Offline replay of a recorded LLM corpus (see services/llm_recorder.py)
+
+    python -m app.replay /path/to/corpus [--save report.json] [--baseline old_report.json]
+
+Every recorded audit is run through analyze_listing again with the recorded model
+responses served instead of Groq, at full speed (no latency, no retry pauses, no quota).
+Reports parse/validation success per model, throughput, token usage and prompt size,
+and with --baseline lists regressions against an earlier report (exit code 1 if any).
+"""
+import io
+import sys
+import json
+import time
+import asyncio
+import argparse
+import contextlib
+from collections import deque
+from types import SimpleNamespace
+from app.services import audit_service, llm_recorder, usage_tracker
+from app.services.audit_schema import parse_audit_json, MalformedOutputError
+from app.services.model_router import model_router
+from app.services.similarity_cache import guest_preview_cache
+
+PARSE_RATE_TOLERANCE = 0.01   # Drop in a model's parse success rate that counts as a regression
+
+
+class ReplayClient:
+    """Duck-types groq.Groq, answering each call with the next recorded response for that model and prompt"""
+
+    def __init__(self, record: dict):
+        self._queues = {}
+        for call in record["calls"]:
+            key = (call["model"], tuple(call["sections"]))
+            self._queues.setdefault(key, deque()).append(call)
+        # Models in the order the live run first tried them
+        self.model_order = list(dict.fromkeys(call["model"] for call in record["calls"]))
+        self.prompt_chars = {}      # distinct prompt -> size, retries and fallbacks count once
+        self.unmatched = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, messages, model, max_tokens=8192, **kwargs):
+        prompt = messages[-1]["content"]
+        sections = tuple(llm_recorder.prompt_sections(prompt))
+        self.prompt_chars[prompt] = len(prompt)
+
+        queue = self._queues.get((model, sections))
+        if not queue:
+            self.unmatched += 1
+            raise Exception(f"No recorded response for {model} {list(sections)} (replay)")
+
+        call = queue.popleft()
+        if "error" in call:
+            raise Exception(call["error"])
+
+        usage = call.get("usage") or {}
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=call["response"]), finish_reason="stop")],
+            usage=SimpleNamespace(prompt_tokens=usage.get("prompt_tokens"),
+                                  completion_tokens=usage.get("completion_tokens")),
+            model=model
+        )
+
+
+# ==================== PARSE STATS ====================
+def parse_stats(records: list) -> tuple:
+    """Run every recorded raw response through cleaning + schema validation"""
+    models = {}
+    started = time.perf_counter()
+    parsed = 0
+
+    for record in records:
+        for call in record["calls"]:
+            stats = models.setdefault(call["model"], {
+                "calls": 0, "errors": 0, "responses": 0, "parsed": 0, "failures": {},
+                "latency_total": 0.0, "prompt_tokens": 0, "completion_tokens": 0, "usage_samples": 0
+            })
+            stats["calls"] += 1
+            stats["latency_total"] += call.get("latency") or 0.0
+            usage = call.get("usage") or {}
+            if usage.get("prompt_tokens") is not None:
+                stats["usage_samples"] += 1
+                stats["prompt_tokens"] += usage["prompt_tokens"] or 0
+                stats["completion_tokens"] += usage.get("completion_tokens") or 0
+
+            if "error" in call:
+                stats["errors"] += 1
+                continue
+
+            stats["responses"] += 1
+            parsed += 1
+            try:
+                parse_audit_json(audit_service.clean_json_response(call["response"].strip()),
+                                 call["required_fields"])
+                stats["parsed"] += 1
+            except MalformedOutputError as e:
+                stats["failures"][e.kind] = stats["failures"].get(e.kind, 0) + 1
+
+    elapsed = time.perf_counter() - started
+    report = {}
+    for model, stats in models.items():
+        report[model] = {
+            "calls": stats["calls"],
+            "api_errors": stats["errors"],
+            "responses": stats["responses"],
+            "parse_rate": round(stats["parsed"] / stats["responses"], 4) if stats["responses"] else None,
+            "parse_failures": stats["failures"],
+            "avg_latency": round(stats["latency_total"] / stats["calls"], 3),
+            "avg_prompt_tokens": round(stats["prompt_tokens"] / stats["usage_samples"]) if stats["usage_samples"] else None,
+            "avg_completion_tokens": round(stats["completion_tokens"] / stats["usage_samples"]) if stats["usage_samples"] else None
+        }
+    return report, (round(parsed / elapsed) if elapsed > 0 else None)
+
+
+# ==================== END-TO-END REPLAY ====================
+async def replay_record(record: dict) -> tuple:
+    client = ReplayClient(record)
+    audit_service.groq_client = client
+    audit_service.AUDIT_MODE = record.get("mode", "single")
+    model_router.reset()
+    # Try models in the recorded order, so the fallback path matches the live run
+    live_order = model_router.ordered_models()
+    model_router.ordered_models = lambda: client.model_order + [m for m in live_order if m not in client.model_order]
+
+    listing = record["input"]
+    try:
+        result = await audit_service.analyze_listing(
+            listing["title"], listing["description"], listing["property_type"],
+            listing["target_audience"], listing.get("amenities", ""), None
+        )
+        outcome = {"status": "ok", "overall_score": result.get("overall_score")}
+    except Exception as e:
+        outcome = {"status": "failed", "error": str(e)}
+    finally:
+        del model_router.ordered_models
+
+    outcome["recorded_status"] = (record.get("outcome") or {}).get("status")
+    return outcome, client
+
+
+async def replay(records: list) -> dict:
+    # Full speed and deterministic: no retry pauses, no recording, no preview cache hits
+    audit_service.RETRY_PAUSE_SECONDS = 0
+    llm_recorder.LLM_RECORD_DIR = ""
+    guest_preview_cache.threshold = 2.0
+    # Replayed calls aren't real spend - keep them out of llm_usage (per-audit and atexit flushes)
+    usage_tracker.supabase = None
+
+    outcomes = {}
+    recorded_chars = []
+    current_chars = []
+    unmatched = 0
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for record in records:
+            outcome, client = await replay_record(record)
+            outcomes[record["id"]] = outcome
+            recorded_chars.extend({call["prompt_hash"]: call["prompt_chars"] for call in record["calls"]}.values())
+            current_chars.extend(client.prompt_chars.values())
+            unmatched += client.unmatched
+    elapsed = time.perf_counter() - started
+
+    ok = sum(1 for outcome in outcomes.values() if outcome["status"] == "ok")
+    return {
+        "audits": len(records),
+        "audits_ok": ok,
+        "audits_failed": len(records) - ok,
+        "replay_seconds": round(elapsed, 3),
+        "audits_per_second": round(len(records) / elapsed, 1) if elapsed > 0 else None,
+        "unmatched_calls": unmatched,
+        "avg_prompt_chars": {
+            "recorded": round(sum(recorded_chars) / len(recorded_chars)) if recorded_chars else None,
+            "current": round(sum(current_chars) / len(current_chars)) if current_chars else None
+        },
+        "outcomes": outcomes
+    }
+
+
+# ==================== REGRESSIONS ====================
+def compare(report: dict, baseline: dict) -> list:
+    regressions = []
+
+    for record_id, outcome in report["outcomes"].items():
+        before = baseline.get("outcomes", {}).get(record_id)
+        if before and before["status"] == "ok" and outcome["status"] != "ok":
+            regressions.append(f"audit {record_id} now fails: {outcome.get('error')}")
+
+    for model, stats in report["models"].items():
+        before = baseline.get("models", {}).get(model)
+        if not before or before["parse_rate"] is None or stats["parse_rate"] is None:
+            continue
+        if stats["parse_rate"] < before["parse_rate"] - PARSE_RATE_TOLERANCE:
+            regressions.append(f"{model} parse rate {before['parse_rate']:.1%} -> {stats['parse_rate']:.1%}")
+
+    before_chars = baseline.get("avg_prompt_chars", {}).get("current")
+    after_chars = report["avg_prompt_chars"]["current"]
+    if before_chars and after_chars and after_chars > before_chars * 1.1:
+        regressions.append(f"average prompt grew {before_chars} -> {after_chars} chars")
+
+    return regressions
+
+
+def print_report(report: dict):
+    print(f"📼 Replayed {report['audits']} audits in {report['replay_seconds']}s "
+          f"({report['audits_per_second']} audits/s, {report['parses_per_second']} parses/s)")
+    print(f"   ✓ {report['audits_ok']} ok   ❌ {report['audits_failed']} failed   "
+          f"⚠ {report['unmatched_calls']} calls without a recording")
+    chars = report["avg_prompt_chars"]
+    print(f"   Avg prompt: {chars['recorded']} chars recorded, {chars['current']} chars now")
+    for model, stats in report["models"].items():
+        rate = f"{stats['parse_rate']:.1%}" if stats["parse_rate"] is not None else "n/a"
+        print(f"   {model}: {stats['calls']} calls, {stats['api_errors']} API errors, parse {rate} "
+              f"{stats['parse_failures'] or ''}, avg {stats['avg_latency']}s, "
+              f"tokens {stats['avg_prompt_tokens']}/{stats['avg_completion_tokens']}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay a recorded LLM corpus offline")
+    parser.add_argument("corpus", help="a .jsonl file or a directory of them (LLM_RECORD_DIR)")
+    parser.add_argument("--save", help="write the report as JSON (use it as a later --baseline)")
+    parser.add_argument("--baseline", help="report from an earlier version to check for regressions")
+    args = parser.parse_args(argv)
+
+    records = llm_recorder.load_corpus(args.corpus)
+    if not records:
+        print(f"❌ No recorded audits in {args.corpus}")
+        return 1
+
+    report = asyncio.run(replay(records))
+    report["models"], report["parses_per_second"] = parse_stats(records)
+    print_report(report)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Report saved to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f))
+        if regressions:
+            print(f"❌ {len(regressions)} regressions against {args.baseline}:")
+            for regression in regressions:
+                print(f"   - {regression}")
+            return 1
+        print(f"✓ No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
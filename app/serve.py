@@ -0,0 +1,42 @@
+"""
+Self-hosted server: multi-worker uvicorn in front of app.main
+
+    python -m app.serve [--host 0.0.0.0] [--port 8000] [--workers N]
+
+Each worker is its own process with its own warm clients, caches and write-behind
+buffer (see app/lifecycle.py). SIGTERM stops accepting connections, lets in-flight
+requests finish for up to GRACEFUL_SHUTDOWN_SECONDS, then flushes and closes.
+Install uvicorn[standard] to get uvloop + httptools on top.
+"""
+import os
+import argparse
+import uvicorn
+
+
+def main(argv=None):
+    # Set before app.config is first imported - here and in the spawned workers
+    os.environ["SELF_HOSTED"] = "1"
+    from app.config import SERVER_WORKERS, GRACEFUL_SHUTDOWN_SECONDS
+
+    parser = argparse.ArgumentParser(description="Run OccupancyOS on a long-lived multi-worker server")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS or os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+    print(f"🚀 Serving on {args.host}:{args.port} with {args.workers} workers")
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        proxy_headers=True,
+        forwarded_allow_ips=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_SECONDS,
+        access_log=False,
+        lifespan="on"
+    )
+
+
+if __name__ == "__main__":
+    main()
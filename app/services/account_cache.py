@@ -0,0 +1,225 @@
+"""
+Last-known-good cache of per-user account data (subscription, recent audits)
+Stale-while-revalidate: a stale entry is served immediately and refreshed in the
+background, so page loads stay fast when Supabase is slow. Only a user with nothing
+cached waits for Supabase, and never longer than UPSTREAM_TIMEOUT.
+Every load is timed, so /health can report upstream latency without a live query.
+"""
+import time
+import asyncio
+from collections import OrderedDict
+from app.config import ACCOUNT_CACHE_FRESH_SECONDS, ACCOUNT_CACHE_MAX_STALE, ACCOUNT_CACHE_MAX_ENTRIES, \
+    UPSTREAM_TIMEOUT, HEALTH_CHECK_INTERVAL
+from app.database import supabase, ensure_user_subscription
+
+LATENCY_EWMA_ALPHA = 0.3
+
+
+# ==================== UPSTREAM LATENCY ====================
+class UpstreamStats:
+    """Rolling latency and last outcome per upstream dependency"""
+
+    def __init__(self):
+        self._stats = {}
+
+    def record(self, name: str, latency: float, error: Exception = None):
+        stats = self._stats.setdefault(name, {"latency_ms": None, "ewma_ms": None, "ok": None,
+                                              "last_error": None, "checked_at": None, "failures": 0})
+        latency_ms = round(latency * 1000, 1)
+        stats["latency_ms"] = latency_ms
+        stats["ewma_ms"] = latency_ms if stats["ewma_ms"] is None else \
+            round(LATENCY_EWMA_ALPHA * latency_ms + (1 - LATENCY_EWMA_ALPHA) * stats["ewma_ms"], 1)
+        stats["ok"] = error is None
+        stats["last_error"] = str(error)[:200] if error else None
+        stats["failures"] = 0 if error is None else stats["failures"] + 1
+        stats["checked_at"] = time.time()
+
+    def get(self, name: str) -> dict:
+        stats = self._stats.get(name)
+        if not stats:
+            return None
+        return dict(stats, age_seconds=round(time.time() - stats["checked_at"], 1))
+
+    def snapshot(self) -> dict:
+        return {name: self.get(name) for name in self._stats}
+
+
+upstream_stats = UpstreamStats()
+
+
+async def timed_call(name: str, func, *args):
+    """Run a blocking upstream call in a thread and record its latency"""
+    started = time.monotonic()
+    try:
+        result = await asyncio.to_thread(func, *args)
+    except Exception as e:
+        upstream_stats.record(name, time.monotonic() - started, e)
+        raise
+    upstream_stats.record(name, time.monotonic() - started)
+    return result
+
+
+# ==================== STALE-WHILE-REVALIDATE ====================
+class StaleWhileRevalidateCache:
+
+    def __init__(self, fresh_seconds: float = ACCOUNT_CACHE_FRESH_SECONDS,
+                 max_stale: float = ACCOUNT_CACHE_MAX_STALE, timeout: float = UPSTREAM_TIMEOUT,
+                 max_entries: int = ACCOUNT_CACHE_MAX_ENTRIES):
+        self.fresh_seconds = fresh_seconds
+        self.max_stale = max_stale
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> [value, fetched_at, must_revalidate], least recently used first
+        self._refreshing = {}   # key -> running refresh task
+
+    async def get(self, key, loader):
+        """
+        (value, is_stale) for key, loading with loader() (a coroutine function) when needed
+        value is None when nothing usable is cached and the upstream didn't answer in time
+        """
+        entry = self._entries.get(key)
+        now = time.monotonic()
+
+        if entry and now - entry[1] > self.max_stale:
+            self._entries.pop(key, None)
+            entry = None
+        elif entry:
+            self._entries.move_to_end(key)
+
+        if entry and not entry[2] and now - entry[1] <= self.fresh_seconds:
+            return entry[0], False
+
+        task = self._refresh(key, loader)
+
+        # Stale but not known to be wrong - serve it now, the refresh lands in the background
+        if entry and not entry[2]:
+            return entry[0], True
+
+        # Nothing cached, or invalidated after a write - wait a bounded time for fresh data
+        try:
+            value = await asyncio.wait_for(asyncio.shield(task), self.timeout)
+            if value is not None:
+                return value, False
+        except asyncio.TimeoutError:
+            print(f"⚠ Upstream slow for {key} - serving {'last known value' if entry else 'nothing'}")
+        except Exception:
+            pass
+        return (entry[0], True) if entry else (None, True)
+
+    def invalidate(self, key):
+        """Data for key just changed - the next read tries upstream first, the old value is only a fallback"""
+        entry = self._entries.get(key)
+        if entry:
+            entry[2] = True
+
+    def _refresh(self, key, loader) -> asyncio.Task:
+        task = self._refreshing.get(key)
+        if task and not task.done():
+            return task
+
+        async def run():
+            try:
+                value = await loader()
+                if value is not None:
+                    self._store(key, value)
+                return value
+            except Exception as e:
+                print(f"⚠ Background refresh of {key} failed: {e}")
+                raise
+            finally:
+                self._refreshing.pop(key, None)
+
+        task = asyncio.create_task(run())
+        # Nobody may await a background refresh - don't let its error go unretrieved
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._refreshing[key] = task
+        return task
+
+    def _store(self, key, value):
+        self._entries[key] = [value, time.monotonic(), False]
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "max_entries": self.max_entries, "refreshing": len(self._refreshing)}
+
+    def pending_refreshes(self) -> list:
+        return [task for task in self._refreshing.values() if not task.done()]
+
+
+account_cache = StaleWhileRevalidateCache()
+
+
+# ==================== ACCOUNT DATA ====================
+def _fetch_recent_audits(user_id: str) -> list:
+    audits = supabase.table("audit_history")\
+        .select("id, listing_title, property_type, score, created_at")\
+        .eq("user_id", user_id)\
+        .order("created_at", desc=True)\
+        .limit(10)\
+        .execute()
+    return audits.data if audits.data else []
+
+
+def _ensure_subscription_or_raise(user_id: str, email: str) -> dict:
+    # ensure_user_subscription swallows errors and returns None - count that as a failed call
+    subscription = ensure_user_subscription(user_id, email)
+    if subscription is None:
+        raise Exception("subscription lookup failed")
+    return subscription
+
+
+async def get_subscription(user_id: str, email: str = None):
+    """(subscription, is_stale)"""
+    return await account_cache.get(
+        ("subscription", user_id),
+        lambda: timed_call("supabase", _ensure_subscription_or_raise, user_id, email)
+    )
+
+
+async def get_recent_audits(user_id: str):
+    """(latest 10 audits, is_stale)"""
+    audits, stale = await account_cache.get(
+        ("recent_audits", user_id),
+        lambda: timed_call("supabase", _fetch_recent_audits, user_id)
+    )
+    return audits or [], stale
+
+
+def invalidate_user(user_id: str):
+    """Call after a write that changes a user's credits or history"""
+    account_cache.invalidate(("subscription", user_id))
+    account_cache.invalidate(("recent_audits", user_id))
+
+
+# ==================== HEALTH ====================
+def _probe_supabase() -> bool:
+    supabase.table("user_subscriptions").select("user_id").limit(1).execute()
+    return True
+
+
+_health_probe = None
+
+
+async def dependency_health() -> dict:
+    """
+    Cached upstream status; a probe only runs (in the background) when the last
+    measurement is older than HEALTH_CHECK_INTERVAL
+    """
+    global _health_probe
+    if supabase:
+        stats = upstream_stats.get("supabase")
+        stale = not stats or stats["age_seconds"] > HEALTH_CHECK_INTERVAL
+        if stale and (_health_probe is None or _health_probe.done()):
+            _health_probe = asyncio.create_task(timed_call("supabase", _probe_supabase))
+            _health_probe.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return upstream_stats.snapshot()
+
+
+def background_tasks() -> list:
+    """Refreshes and health probes still running (waited for on shutdown)"""
+    tasks = account_cache.pending_refreshes()
+    if _health_probe is not None and not _health_probe.done():
+        tasks.append(_health_probe)
+    return tasks
@@ -0,0 +1,212 @@
+"""
+Local amenity knowledge index
+Canonical amenities, their synonyms and ROI priors per property type and audience,
+so the amenity gap analysis can be computed before the LLM is called
+"""
+import re
+
+# ==================== CANONICAL AMENITIES ====================
+# base_roi: 0-1 prior of how much the amenity moves bookings for an average listing
+# estimated_roi: the honest, human-readable estimate shown to hosts
+AMENITIES = {
+    "WiFi": {"synonyms": ["wifi", "wi-fi", "wi fi", "internet", "wireless internet", "fast wifi", "broadband", "high speed internet"],
+             "base_roi": 0.95, "estimated_roi": "+10-15% bookings (expected by almost every guest)"},
+    "Kitchen": {"synonyms": ["kitchen", "full kitchen", "kitchenette", "cooking basics", "stove", "oven"],
+                "base_roi": 0.7, "estimated_roi": "+5-10% bookings, longer stays"},
+    "Parking": {"synonyms": ["parking", "free parking", "garage", "driveway", "car park", "on-site parking"],
+                "base_roi": 0.55, "estimated_roi": "+4-8% bookings where street parking is scarce"},
+    "Workspace": {"synonyms": ["workspace", "dedicated workspace", "desk", "office", "work desk", "home office", "laptop friendly"],
+                  "base_roi": 0.5, "estimated_roi": "+8-12% bookings from remote and business guests"},
+    "Pool": {"synonyms": ["pool", "swimming pool", "private pool", "plunge pool"],
+             "base_roi": 0.35, "estimated_roi": "+10-20% nightly rate in warm seasons"},
+    "Hot Tub": {"synonyms": ["hot tub", "jacuzzi", "spa", "hottub", "whirlpool"],
+                "base_roi": 0.4, "estimated_roi": "+10-15% nightly rate, strong search filter"},
+    "Washer": {"synonyms": ["washer", "washing machine", "laundry", "washer/dryer", "dryer", "washer and dryer"],
+               "base_roi": 0.45, "estimated_roi": "+5-8% bookings for stays over 3 nights"},
+    "AC": {"synonyms": ["ac", "a/c", "air conditioning", "air conditioner", "aircon", "central air", "cooling"],
+           "base_roi": 0.6, "estimated_roi": "+5-10% bookings in summer"},
+    "Pets": {"synonyms": ["pets", "pet friendly", "pets allowed", "dog friendly", "pet-friendly", "dogs allowed"],
+             "base_roi": 0.3, "estimated_roi": "+8-12% bookings, pet fee revenue"},
+    "Smart TV": {"synonyms": ["smart tv", "tv", "netflix", "streaming", "television", "cable tv"],
+                 "base_roi": 0.35, "estimated_roi": "+2-4% bookings"},
+    "Coffee Maker": {"synonyms": ["coffee maker", "coffee machine", "espresso machine", "nespresso", "coffee", "keurig"],
+                     "base_roi": 0.4, "estimated_roi": "+3-5% bookings, better reviews"},
+    "Smart Lock": {"synonyms": ["smart lock", "self check-in", "self check in", "keypad", "keyless entry", "lockbox", "keyless"],
+                   "base_roi": 0.45, "estimated_roi": "+3-6% bookings, fewer check-in issues"},
+    "Heating": {"synonyms": ["heating", "heater", "central heating", "radiator", "heat"],
+                "base_roi": 0.5, "estimated_roi": "+4-8% bookings in cold seasons"},
+    "Fireplace": {"synonyms": ["fireplace", "wood stove", "fire place", "wood burning stove"],
+                  "base_roi": 0.25, "estimated_roi": "+5-10% nightly rate in winter"},
+    "BBQ Grill": {"synonyms": ["bbq", "grill", "barbecue", "bbq grill", "gas grill"],
+                  "base_roi": 0.25, "estimated_roi": "+3-6% bookings from groups and families"},
+    "Outdoor Space": {"synonyms": ["patio", "balcony", "deck", "terrace", "garden", "backyard", "yard", "porch"],
+                      "base_roi": 0.35, "estimated_roi": "+4-8% bookings"},
+    "Dishwasher": {"synonyms": ["dishwasher", "dish washer"],
+                   "base_roi": 0.2, "estimated_roi": "+2-4% bookings for longer stays"},
+    "Crib": {"synonyms": ["crib", "cot", "pack n play", "pack 'n play", "travel crib", "baby cot"],
+             "base_roi": 0.15, "estimated_roi": "+5-10% bookings from families with babies"},
+    "High Chair": {"synonyms": ["high chair", "highchair", "baby chair"],
+                   "base_roi": 0.1, "estimated_roi": "+3-5% bookings from families with toddlers"},
+    "Board Games": {"synonyms": ["board games", "games", "game room", "toys", "books and toys"],
+                    "base_roi": 0.15, "estimated_roi": "+2-4% bookings, better reviews from families"},
+    "EV Charger": {"synonyms": ["ev charger", "electric vehicle charger", "tesla charger", "ev charging"],
+                   "base_roi": 0.15, "estimated_roi": "+3-6% bookings from EV drivers"},
+    "Gym": {"synonyms": ["gym", "fitness center", "exercise equipment", "fitness room", "peloton"],
+            "base_roi": 0.15, "estimated_roi": "+2-5% bookings from business travelers"},
+    "Iron": {"synonyms": ["iron", "ironing board", "steamer"],
+             "base_roi": 0.15, "estimated_roi": "+1-3% bookings from business travelers"},
+    "Blackout Curtains": {"synonyms": ["blackout curtains", "blackout blinds", "room darkening shades"],
+                          "base_roi": 0.15, "estimated_roi": "Better sleep reviews, +1-3% bookings"},
+    "Accessible Entrance": {"synonyms": ["step-free entrance", "step free access", "wheelchair accessible", "elevator", "lift", "ground floor"],
+                            "base_roi": 0.15, "estimated_roi": "+5-10% bookings from seniors and guests with mobility needs"},
+    "Fenced Yard": {"synonyms": ["fenced yard", "fenced garden", "enclosed yard", "fenced backyard"],
+                    "base_roi": 0.1, "estimated_roi": "+5-8% bookings from pet owners"},
+    "Outdoor Gear Storage": {"synonyms": ["gear storage", "ski storage", "bike storage", "boot dryer", "ski locker"],
+                             "base_roi": 0.1, "estimated_roi": "+3-6% bookings from adventure travelers"},
+    "Beach Gear": {"synonyms": ["beach chairs", "beach umbrella", "beach towels", "beach gear"],
+                   "base_roi": 0.1, "estimated_roi": "+3-5% bookings, better reviews"},
+    "Extra Beds": {"synonyms": ["sofa bed", "bunk beds", "air mattress", "extra beds", "futon", "pull-out sofa"],
+                   "base_roi": 0.15, "estimated_roi": "+5-10% bookings from larger groups"},
+}
+
+# ==================== ROI PRIORS ====================
+# Multipliers on base_roi - anything not listed stays at 1.0
+PROPERTY_TYPE_WEIGHTS = {
+    "Apartment": {"Workspace": 1.3, "Smart Lock": 1.4, "AC": 1.2, "Washer": 1.2, "Pool": 0.3, "Hot Tub": 0.3,
+                  "BBQ Grill": 0.4, "Fireplace": 0.4, "Fenced Yard": 0.2, "Parking": 1.3, "Blackout Curtains": 1.3},
+    "Loft": {"Workspace": 1.4, "Smart Lock": 1.4, "Coffee Maker": 1.3, "Smart TV": 1.2, "Pool": 0.3, "Hot Tub": 0.3,
+             "Fenced Yard": 0.2, "BBQ Grill": 0.4, "Blackout Curtains": 1.3},
+    "House": {"Parking": 1.3, "Washer": 1.3, "Outdoor Space": 1.4, "BBQ Grill": 1.5, "Dishwasher": 1.5,
+              "Extra Beds": 1.3, "Hot Tub": 1.2},
+    "Townhouse": {"Parking": 1.3, "Washer": 1.2, "Outdoor Space": 1.3, "Dishwasher": 1.3, "BBQ Grill": 1.2},
+    "Cabin": {"Hot Tub": 2.0, "Fireplace": 2.5, "Heating": 1.5, "BBQ Grill": 1.6, "Outdoor Space": 1.5,
+              "Board Games": 1.8, "Outdoor Gear Storage": 2.0, "Pool": 0.4, "Smart Lock": 1.3},
+    "Villa": {"Pool": 2.2, "Hot Tub": 1.6, "Outdoor Space": 1.6, "BBQ Grill": 1.5, "Dishwasher": 1.5,
+              "Gym": 1.5, "Extra Beds": 1.2},
+    "Tiny House": {"Hot Tub": 1.4, "Outdoor Space": 1.5, "Coffee Maker": 1.4, "Heating": 1.3, "Fireplace": 1.3,
+                   "Pool": 0.2, "Dishwasher": 0.3, "Extra Beds": 0.3, "Gym": 0.2},
+    "Beachfront": {"AC": 1.4, "Beach Gear": 3.0, "Outdoor Space": 1.6, "Washer": 1.3, "Pool": 1.2,
+                   "BBQ Grill": 1.3, "Fireplace": 0.3, "Heating": 0.6},
+}
+
+AUDIENCE_WEIGHTS = {
+    "Remote Workers": {"WiFi": 1.3, "Workspace": 2.5, "Coffee Maker": 1.5, "Blackout Curtains": 1.2, "Washer": 1.3,
+                       "Kitchen": 1.2},
+    "Families": {"Crib": 4.0, "High Chair": 4.0, "Board Games": 2.5, "Washer": 1.5, "Kitchen": 1.3, "Extra Beds": 1.8,
+                 "Outdoor Space": 1.4, "Pool": 1.3, "Dishwasher": 1.5},
+    "Business Travelers": {"Workspace": 2.2, "Iron": 3.0, "Smart Lock": 1.5, "Coffee Maker": 1.4, "Gym": 2.0,
+                           "Blackout Curtains": 1.6, "Parking": 1.2},
+    "Adventure Seekers": {"Outdoor Gear Storage": 3.5, "Hot Tub": 1.5, "Washer": 1.4, "Parking": 1.4, "BBQ Grill": 1.3,
+                          "EV Charger": 1.2},
+    "Retirees": {"Accessible Entrance": 4.0, "Heating": 1.3, "Parking": 1.4, "Coffee Maker": 1.3, "Smart TV": 1.3,
+                 "Pool": 0.8, "Extra Beds": 0.5},
+    "Large Groups": {"Extra Beds": 3.5, "Dishwasher": 2.0, "BBQ Grill": 1.8, "Parking": 1.6, "Hot Tub": 1.4,
+                     "Board Games": 1.6, "Washer": 1.3},
+    "Pet Owners": {"Pets": 4.0, "Fenced Yard": 5.0, "Outdoor Space": 1.6, "Washer": 1.3, "Parking": 1.2},
+}
+
+# Shortlist sizes
+SHORTLIST_SIZE = 5
+CRITICAL_ROI = 0.9
+HIGH_ROI = 0.5
+
+_PUNCTUATION = re.compile(r"[^a-z0-9/'\- ]+")
+_SPACES = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    return _SPACES.sub(" ", _PUNCTUATION.sub(" ", text.lower())).strip()
+
+
+# ==================== INDEX (built once at import) ====================
+SYNONYM_INDEX = {}
+for _name, _info in AMENITIES.items():
+    SYNONYM_INDEX[_normalize(_name)] = _name
+    for _synonym in _info["synonyms"]:
+        SYNONYM_INDEX[_normalize(_synonym)] = _name
+
+# Longest synonyms first so "hot tub" wins over "tub"-like shorter matches inside free text
+_SYNONYM_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(s) for s in sorted(SYNONYM_INDEX, key=len, reverse=True)) + r")\b"
+)
+
+
+def match_amenities(amenities: str) -> tuple:
+    """
+    Match the user's comma-separated amenities against the index
+    Returns (set of canonical amenities, list of unrecognised items)
+    """
+    present = set()
+    unmatched = []
+    for item in amenities.split(","):
+        normalized = _normalize(item)
+        if not normalized:
+            continue
+        if normalized in SYNONYM_INDEX:
+            present.add(SYNONYM_INDEX[normalized])
+            continue
+        hits = _SYNONYM_PATTERN.findall(normalized)
+        if hits:
+            present.update(SYNONYM_INDEX[hit] for hit in hits)
+        else:
+            unmatched.append(item.strip())
+    return present, unmatched
+
+
+def roi_weight(amenity: str, property_type: str, target_audience: str) -> float:
+    weight = AMENITIES[amenity]["base_roi"]
+    weight *= PROPERTY_TYPE_WEIGHTS.get(property_type, {}).get(amenity, 1.0)
+    weight *= AUDIENCE_WEIGHTS.get(target_audience, {}).get(amenity, 1.0)
+    return weight
+
+
+def _priority(weight: float) -> str:
+    if weight >= CRITICAL_ROI:
+        return "critical"
+    if weight >= HIGH_ROI:
+        return "high"
+    return "medium"
+
+
+def amenity_gap(property_type: str, target_audience: str, amenities: str) -> dict:
+    """
+    Local amenity gap analysis in one pass over the catalog
+    Returns present/missing amenities, a coverage score and the high-ROI shortlist for the LLM
+    """
+    present, unmatched = match_amenities(amenities)
+
+    ranked = sorted(
+        ((roi_weight(name, property_type, target_audience), name) for name in AMENITIES),
+        reverse=True
+    )
+    # Coverage = ROI weight the listing already has, out of the most valuable amenities for this property/audience
+    top = ranked[:10]
+    top_total = sum(weight for weight, _ in top)
+    covered = sum(weight for weight, name in top if name in present)
+    coverage_score = round(100 * covered / top_total) if top_total else 0
+
+    shortlist = [
+        {
+            "amenity": name,
+            "estimated_roi": AMENITIES[name]["estimated_roi"],
+            "priority": _priority(weight)
+        }
+        for weight, name in ranked if name not in present
+    ][:SHORTLIST_SIZE]
+
+    return {
+        "present": sorted(present),
+        "unrecognized": unmatched,
+        "coverage_score": coverage_score,
+        "critical_missing": [item["amenity"] for item in shortlist if item["priority"] in ("critical", "high")],
+        "shortlist": shortlist
+    }
+
+
+def canonical_amenity(name: str):
+    """Canonical catalog name for an LLM-suggested amenity, or None"""
+    normalized = _normalize(name or "")
+    if normalized in SYNONYM_INDEX:
+        return SYNONYM_INDEX[normalized]
+    hits = _SYNONYM_PATTERN.findall(normalized)
+    return SYNONYM_INDEX[hits[0]] if hits else None
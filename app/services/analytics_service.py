@@ -0,0 +1,154 @@
+"""
+Score-trend analytics backed by incrementally maintained rollups
+Every saved audit folds into per-user daily and weekly buckets per property type
+(count, sum, min, max), so a trend chart is one small read of audit_score_rollups
+no matter how many audits a user has.
+"""
+from datetime import datetime, date, timedelta
+from app.database import supabase
+
+ROLLUP_TABLE = "audit_score_rollups"
+PERIODS = ("day", "week")
+
+
+# ==================== BUCKETING ====================
+def period_start(day: date, period: str) -> str:
+    """First day of the bucket a date falls in - weeks start on Monday"""
+    if period == "week":
+        day = day - timedelta(days=day.weekday())
+    return day.isoformat()
+
+
+def _audit_day(row: dict) -> date:
+    created_at = row.get("created_at")
+    if created_at:
+        try:
+            return datetime.fromisoformat(str(created_at).replace("Z", "+00:00")).date()
+        except ValueError:
+            pass
+    return datetime.utcnow().date()
+
+
+def aggregate(rows: list) -> dict:
+    """(user_id, period, period_start, property_type) -> partial rollup of the given audit rows"""
+    buckets = {}
+    for row in rows:
+        if not row.get("user_id") or row.get("score") is None:
+            continue
+        score = int(row["score"])
+        day = _audit_day(row)
+        for period in PERIODS:
+            key = (row["user_id"], period, period_start(day, period), row.get("property_type") or "Unknown")
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = {"audit_count": 1, "score_sum": score, "score_min": score, "score_max": score}
+            else:
+                bucket["audit_count"] += 1
+                bucket["score_sum"] += score
+                bucket["score_min"] = min(bucket["score_min"], score)
+                bucket["score_max"] = max(bucket["score_max"], score)
+    return buckets
+
+
+def _merge(existing: dict, partial: dict) -> dict:
+    if not existing:
+        return dict(partial)
+    return {
+        "audit_count": existing["audit_count"] + partial["audit_count"],
+        "score_sum": existing["score_sum"] + partial["score_sum"],
+        "score_min": min(existing["score_min"], partial["score_min"]),
+        "score_max": max(existing["score_max"], partial["score_max"]),
+    }
+
+
+# ==================== MAINTENANCE ====================
+# Both writes are Postgres functions (see README), so each is one atomic statement/transaction:
+# concurrent instances and workers can't lose each other's increments
+INCREMENT_FUNCTION = "increment_score_rollups"
+REBUILD_FUNCTION = "rebuild_score_rollups"
+
+
+def _rollup_rows(buckets: dict) -> list:
+    return [
+        {"user_id": user_id, "period": period, "period_start": start, "property_type": property_type, **bucket}
+        for (user_id, period, start, property_type), bucket in buckets.items()
+    ]
+
+
+def update_rollups(rows: list):
+    """
+    Fold newly saved audit_history rows into the rollups
+    One RPC per batch - insert ... on conflict do update set audit_count = audit_count + excluded.audit_count
+    """
+    if not supabase or not rows:
+        return
+
+    buckets = aggregate(rows)
+    if not buckets:
+        return
+
+    supabase.rpc(INCREMENT_FUNCTION, {"rollups": _rollup_rows(buckets)}).execute()
+    print(f"✓ Updated {len(buckets)} score rollups from {len(rows)} audits")
+
+
+def rebuild_rollups(user_id: str) -> int:
+    """
+    Recompute a user's rollups from audit_history (backfill for audits saved before rollups existed)
+    The function aggregates and replaces in one transaction - no pages to read, and no audit saved
+    between a read and the replace whose increment would then be wiped out
+    Returns the number of audits counted
+    """
+    if not supabase:
+        raise Exception("Service not configured")
+
+    counted = supabase.rpc(REBUILD_FUNCTION, {"target_user_id": user_id}).execute().data or 0
+
+    print(f"✓ Rebuilt score rollups for user {user_id} from {counted} audits")
+    return counted
+
+
+# ==================== READS ====================
+def _point(start: str, bucket: dict) -> dict:
+    return {
+        "period_start": start,
+        "count": bucket["audit_count"],
+        "avg": round(bucket["score_sum"] / bucket["audit_count"], 1) if bucket["audit_count"] else None,
+        "min": bucket["score_min"],
+        "max": bucket["score_max"]
+    }
+
+
+def get_score_trends(user_id: str, period: str = "week", days: int = 90, property_type: str = None) -> dict:
+    """
+    Score trend series for a user, overall and per property type
+    Reads only the rollup rows in the window
+    """
+    if not supabase:
+        raise Exception("Service not configured")
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of: {', '.join(PERIODS)}")
+
+    since = period_start(datetime.utcnow().date() - timedelta(days=days), period)
+
+    query = supabase.table(ROLLUP_TABLE)\
+        .select("period_start, property_type, audit_count, score_sum, score_min, score_max")\
+        .eq("user_id", user_id)\
+        .eq("period", period)\
+        .gte("period_start", since)
+    if property_type:
+        query = query.eq("property_type", property_type)
+    rows = query.order("period_start").execute().data or []
+
+    by_property_type = {}
+    overall = {}
+    for row in rows:
+        start = str(row["period_start"])
+        by_property_type.setdefault(row["property_type"], []).append(_point(start, row))
+        overall[start] = _merge(overall.get(start), row)
+
+    return {
+        "period": period,
+        "since": since,
+        "overall": [_point(start, overall[start]) for start in sorted(overall)],
+        "by_property_type": by_property_type
+    }
@@ -0,0 +1,244 @@
+"""
+Prompt building blocks for the listing audit
+The full audit prompt and the narrow section prompts share the same schema snippets
+"""
+
+# ==================== RESULT SCHEMA ====================
+# Entries of "detailed_scores"
+SCORE_SCHEMAS = {
+    "seo_optimization": '{"score": <0-100>, "explanation": "honest feedback", "recommendations": "specific fixes based ONLY on what user provided"}',
+    "emotional_appeal": '{"score": <0-100>, "explanation": "fair assessment", "improvements": "what\'s wrong or what\'s right"}',
+    "description_quality": '{"score": <0-100>, "word_count": <actual count>, "structure_issues": ["real issues found"], "strengths": ["genuine strengths if any"]}',
+    "amenity_coverage": '{"score": <0-100>, "critical_missing": ["amenities that would help THIS property type and audience"]}',
+    "target_audience_alignment": '{"score": <0-100>, "recommendations": "fix targeting based on actual content"}',
+    "booking_conversion_potential": '{"score": <0-100>, "friction_points": ["real dealbreakers from the listing"]}',
+}
+
+# Top-level sections after "detailed_scores"
+SECTION_SCHEMAS = {
+    "optimized_titles": '''{
+    "seo_focused": "keyword-rich title using ONLY info user provided - no beach/mountain/downtown unless they mentioned it",
+    "emotional_focused": "emotion-driven title based on ACTUAL listing features",
+    "click_optimized": "curiosity title using REAL property details",
+    "audience_specific": "title for {target_audience} using ONLY verified info"
+  }''',
+    "description_rewrite": '''{
+    "full_rewrite": "400-word rewrite in PLAIN TEXT using ONLY the information provided. No assumptions about location, views, or amenities not mentioned. If user said 'no kids', work with that truthfully. No markdown, no asterisks.",
+    "hook_section": "compelling opening using REAL details from listing",
+    "key_improvements": ["actual fixes applied to their specific listing"]
+  }''',
+    "amenity_analysis": '''{
+    "high_roi_additions": [
+      {"amenity": "realistic addition for THIS property", "estimated_roi": "honest estimate", "priority": "critical/high/medium", "reasoning": "why this makes sense for {property_type} targeting {target_audience}"}
+    ]
+  }''',
+    "immediate_action_items": '''[
+    {"action": "specific task based on their ACTUAL listing", "impact": "critical/high/medium", "effort": "quick-win/moderate/significant", "why": "realistic expected outcome"}
+  ]''',
+    "critical_warnings": '["severe issues if found - empty array if listing is actually good"]',
+}
+
+# Used instead of the full amenity_analysis schema when the local amenity index already
+# picked the candidates - the model only has to choose and explain, ROI and priority come from the index
+AMENITY_SHORTLIST_SCHEMA = '''{
+    "high_roi_additions": [
+      {"amenity": "one amenity from the PRECOMPUTED SHORTLIST", "reasoning": "why this makes sense for {property_type} targeting {target_audience}"}
+    ]
+  }'''
+
+OVERALL_SCHEMA = '''  "overall_score": <0-100>,
+  "overall_explanation": "2-3 sentences of HONEST assessment - harsh if bad, praise if genuinely good"'''
+
+
+# ==================== RULES ====================
+SCORING_CRITERIA = """BRUTAL BUT HONEST SCORING CRITERIA - BE EXTREMELY HARSH:
+
+0-10: Complete disaster. Fatal contradictions, offensive content, or essentially empty.
+  Example: Title "not good" + description "get away" = 8/100 (CATASTROPHIC - essentially no information)
+  Example: "No kids" + targeting families = 3/100
+
+11-20: Catastrophically bad. One or two word titles, near-empty descriptions that provide ZERO useful information.
+  Example: Title "cozy", description "apartment" = 15/100
+  Example: Title "place", description "for rent" = 12/100
+
+21-35: Terrible. Extremely minimal effort, missing all basics, provides almost no value.
+  Example: "Nice place downtown. Has bed." = 28/100
+
+36-50: Very poor. Generic, lazy, missing critical information.
+  Example: "Comfortable apartment with kitchen and wifi in the city" = 45/100
+
+51-65: Below average to average. Bare minimum effort, forgettable.
+  Example: Decent description but generic title, no emotional appeal = 60/100
+
+66-75: Slightly above average. Shows some effort but unremarkable.
+  Example: Basic SEO + structured description = 70/100
+
+76-85: Good. Solid work, clear effort, above most competitors.
+  Example: SEO-optimized title + structured description + some storytelling = 80/100
+
+86-92: Excellent. Professional-grade. Strong SEO + emotion + targeting.
+  Example: Keyword-rich title + emotional narrative + perfect audience alignment = 89/100
+
+93-100: EXCEPTIONAL. Masterclass in optimization. Reserve 95-100 for truly PERFECT listings.
+  Example: "Luxury Downtown Loft | Chef's Kitchen | Rooftop Deck | 2min to Metro" + vivid storytelling description + perfect amenity showcase = 97/100
+
+CRITICAL SCORING RULES - ENFORCE STRICTLY:
+
+- IF TITLE IS 1-3 WORDS: Maximum score is 20/100, no exceptions
+- IF DESCRIPTION IS UNDER 20 WORDS: Maximum score is 25/100, no exceptions
+- IF TITLE + DESCRIPTION PROVIDE ESSENTIALLY NO INFO: Maximum score is 10/100
+- TARGET AUDIENCE MISMATCH: Maximum score is 15/100
+- NO PROPERTY DETAILS PROVIDED: Maximum score is 30/100"""
+
+SUGGESTION_RULES = """CRITICAL RULES FOR SUGGESTIONS:
+
+NEVER ASSUME LOCATION DETAILS
+- Don't say "near beach" unless they mentioned water/ocean/beach
+- Don't say "mountain views" unless they said mountains/views/elevation
+- Don't say "downtown" unless they said downtown/city center/central
+- Use ONLY what they gave you: property type, their amenities, their description
+
+WORK WITH WHAT THEY HAVE
+- If they said "no kids policy" - make that a SELLING POINT for couples/professionals
+- If amenities are basic - optimize what exists, don't invent amenities
+- If description is short - expand on details THEY provided, don't fabricate
+
+BE HONEST ABOUT EXCELLENCE
+- If a listing truly has perfect SEO + emotion + structure + targeting → give 90+
+- Don't artificially inflate scores for terrible listings
+
+REALISTIC AMENITY SUGGESTIONS
+- For studio apartments: suggest coffee maker, not hot tub
+- For budget properties: suggest smart lock, not pool
+- For urban: suggest workspace, not kayaks
+- Base ALL suggestions on property_type and target_audience
+
+RESPONSE FORMAT:
+- Use PLAIN TEXT in descriptions (NO **, NO *, NO markdown)
+- Be BRUTALLY HONEST in scores and explanations
+- If listing is garbage, give it 5-15
+- If listing is perfect, give it 95-100
+- Return ONLY valid, complete JSON (no code blocks, no truncation)"""
+
+PERSONA = "You are a BRUTAL but FAIR Airbnb listing critic with 15 years of experience. You give harsh truth when deserved, but you also recognize genuinely excellent work."
+
+
+# ==================== BUILDERS ====================
+def _fill(template: str, property_type: str, target_audience: str) -> str:
+    """Substitute listing placeholders without touching the JSON braces"""
+    return template.replace("{property_type}", property_type).replace("{target_audience}", target_audience)
+
+
+def build_schema(property_type: str, target_audience: str, score_keys=None,
+                 section_keys=None, include_overall: bool = True, amenity_gap: dict = None) -> str:
+    """Assemble the JSON structure the model must return"""
+    if score_keys is None:
+        score_keys = list(SCORE_SCHEMAS)
+    if section_keys is None:
+        section_keys = list(SECTION_SCHEMAS)
+
+    parts = []
+    if include_overall:
+        parts.append(OVERALL_SCHEMA)
+    if score_keys:
+        scores = ",\n".join(f'    "{key}": {SCORE_SCHEMAS[key]}' for key in score_keys)
+        parts.append(f'  "detailed_scores": {{\n{scores}\n  }}')
+    for key in section_keys:
+        template = SECTION_SCHEMAS[key]
+        if key == "amenity_analysis" and amenity_gap and amenity_gap["shortlist"]:
+            template = AMENITY_SHORTLIST_SCHEMA
+        parts.append(f'  "{key}": {_fill(template, property_type, target_audience)}')
+
+    return "{\n" + ",\n".join(parts) + "\n}"
+
+
+def listing_block(title: str, description: str, property_type: str,
+                  target_audience: str, amenities_list: list) -> str:
+    return f"""Title: {title}
+Description: {description}
+Property Type: {property_type}
+Target Audience: {target_audience}
+Current Amenities: {', '.join(amenities_list)}"""
+
+
+def amenity_block(amenity_gap: dict) -> str:
+    """The precomputed amenity gap, so the model picks from a shortlist instead of brainstorming"""
+    if not amenity_gap:
+        return ""
+    present = ", ".join(amenity_gap["present"]) or "none recognised"
+    shortlist = ", ".join(item["amenity"] for item in amenity_gap["shortlist"]) or "none - coverage is complete"
+    return f"""PRECOMPUTED AMENITY GAP (from our ROI index for this property type and audience):
+Recognised amenities: {present}
+Index coverage score: {amenity_gap['coverage_score']}/100
+PRECOMPUTED SHORTLIST of missing high-ROI amenities: {shortlist}
+Pick high_roi_additions ONLY from the shortlist and just explain why each fits this listing.
+
+"""
+
+
+def seo_block(seo_signal: dict) -> str:
+    """The local keyword-index score of the current title, as a grounding signal for SEO scoring and titles"""
+    if not seo_signal:
+        return ""
+    keywords = ", ".join(seo_signal["keywords_found"]) or "none"
+    suggested = ", ".join(seo_signal["suggested_keywords"]) or "none"
+    issues = "; ".join(seo_signal["issues"]) or "none"
+    return f"""LOCAL SEO SIGNAL (from our keyword index - use it to ground the SEO score and titles):
+Current title score: {seo_signal['score']}/100, {seo_signal['length']}/{seo_signal['max_length']} characters
+Search keywords in title: {keywords}
+Keywords from THEIR description missing in the title: {suggested}
+Title issues: {issues}
+Every optimized title MUST be {seo_signal['max_length']} characters or fewer.
+
+"""
+
+
+def build_audit_prompt(title: str, description: str, property_type: str,
+                       target_audience: str, amenities_list: list, amenity_gap: dict = None,
+                       seo_signal: dict = None) -> str:
+    """The full single-shot audit prompt"""
+    return f"""{PERSONA}
+
+LISTING TO ANALYZE:
+
+{listing_block(title, description, property_type, target_audience, amenities_list)}
+
+{amenity_block(amenity_gap)}{seo_block(seo_signal)}Return this EXACT JSON structure:
+{build_schema(property_type, target_audience, amenity_gap=amenity_gap)}
+
+CRITICAL: Return ONLY valid JSON. No explanations before or after. Ensure all JSON is complete and properly closed.
+
+{SCORING_CRITERIA}
+
+{SUGGESTION_RULES}
+
+Remember: Your job is TRUTH. A 2-word title and 2-word description is a DISASTER and deserves 5-15 maximum.
+"""
+
+
+def build_section_prompt(title: str, description: str, property_type: str, target_audience: str,
+                         amenities_list: list, score_keys: list, section_keys: list,
+                         include_overall: bool = False, context: str = "", amenity_gap: dict = None,
+                         seo_signal: dict = None) -> str:
+    """A narrow prompt that only asks for the given sections"""
+    schema = build_schema(property_type, target_audience, score_keys, section_keys, include_overall, amenity_gap)
+    scoring = f"{SCORING_CRITERIA}\n\n" if (score_keys or include_overall) else ""
+    context_block = f"{context}\n\n" if context else ""
+    if amenity_gap and ("amenity_analysis" in section_keys or "amenity_coverage" in score_keys):
+        context_block += amenity_block(amenity_gap)
+    if seo_signal and ("optimized_titles" in section_keys or "seo_optimization" in score_keys):
+        context_block += seo_block(seo_signal)
+
+    return f"""{PERSONA}
+
+LISTING TO ANALYZE:
+
+{listing_block(title, description, property_type, target_audience, amenities_list)}
+
+{context_block}Return ONLY these sections of the audit, in this EXACT JSON structure:
+{schema}
+
+CRITICAL: Return ONLY valid JSON. No explanations before or after. Ensure all JSON is complete and properly closed.
+
+{scoring}{SUGGESTION_RULES}
+"""
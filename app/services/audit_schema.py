@@ -0,0 +1,234 @@
+"""
+Typed schema of the audit result
+Model output is parsed, validated, coerced and defaulted in one pass by compiled
+pydantic-core validators (TypeAdapter.validate_json), instead of json.loads plus
+hand-written key checks. Partial results (parallel parts, re-audits) use adapters
+built from the same field definitions.
+"""
+import re
+from functools import lru_cache
+from typing import Annotated, Any, List, Optional, get_type_hints
+from pydantic import BaseModel, BeforeValidator, ConfigDict, TypeAdapter, ValidationError, create_model
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+# ==================== COERCION ====================
+def _coerce_score(value: Any) -> int:
+    """85, 85.4, "85", "85/100" -> 85, clamped to 0-100"""
+    if isinstance(value, bool):
+        raise ValueError("score must be a number")
+    if isinstance(value, str):
+        match = _NUMBER.search(value)
+        if not match:
+            raise ValueError(f"score must be a number, got {value[:30]!r}")
+        value = float(match.group())
+    if isinstance(value, (int, float)):
+        return max(0, min(100, round(value)))
+    raise ValueError("score must be a number")
+
+
+def _coerce_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return " ".join(str(item) for item in value)
+    return value if isinstance(value, str) else str(value)
+
+
+def _coerce_count(value: Any):
+    """350 or "350 words" -> 350, anything else -> None"""
+    if isinstance(value, str):
+        match = _NUMBER.search(value)
+        return round(float(match.group())) if match else None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return round(value)
+    return None
+
+
+def _coerce_list(value: Any) -> list:
+    if value is None or value == "":
+        return []
+    if isinstance(value, (str, dict)):
+        return [value]
+    return value
+
+
+def _coerce_item(field: str):
+    """Let a bare string stand in for an object with that string as `field`"""
+    def coerce(value: Any):
+        return {field: value} if isinstance(value, str) else value
+    return coerce
+
+
+Score = Annotated[int, BeforeValidator(_coerce_score)]
+Text = Annotated[str, BeforeValidator(_coerce_text)]
+TextList = Annotated[List[Text], BeforeValidator(_coerce_list)]
+
+
+class _Section(BaseModel):
+    # Extra keys the model adds (or we add later) are kept, not rejected
+    model_config = ConfigDict(extra="allow")
+
+
+# ==================== DETAILED SCORES ====================
+class SeoScore(_Section):
+    score: Score
+    explanation: Text = ""
+    recommendations: Text = ""
+
+
+class EmotionalScore(_Section):
+    score: Score
+    explanation: Text = ""
+    improvements: Text = ""
+
+
+class DescriptionQualityScore(_Section):
+    score: Score
+    explanation: Text = ""
+    word_count: Annotated[Optional[int], BeforeValidator(_coerce_count)] = None
+    structure_issues: TextList = []
+    strengths: TextList = []
+
+
+class AmenityCoverageScore(_Section):
+    score: Score
+    explanation: Text = ""
+    critical_missing: TextList = []
+
+
+class AudienceScore(_Section):
+    score: Score
+    explanation: Text = ""
+    recommendations: Text = ""
+
+
+class ConversionScore(_Section):
+    score: Score
+    explanation: Text = ""
+    friction_points: TextList = []
+
+
+class DetailedScores(_Section):
+    # Optional because partial prompts only ask for some categories
+    seo_optimization: Optional[SeoScore] = None
+    emotional_appeal: Optional[EmotionalScore] = None
+    description_quality: Optional[DescriptionQualityScore] = None
+    amenity_coverage: Optional[AmenityCoverageScore] = None
+    target_audience_alignment: Optional[AudienceScore] = None
+    booking_conversion_potential: Optional[ConversionScore] = None
+
+
+# ==================== SECTIONS ====================
+class OptimizedTitles(_Section):
+    seo_focused: Text = ""
+    emotional_focused: Text = ""
+    click_optimized: Text = ""
+    audience_specific: Text = ""
+
+
+class DescriptionRewrite(_Section):
+    full_rewrite: Text = ""
+    hook_section: Text = ""
+    key_improvements: TextList = []
+
+
+class AmenityAddition(_Section):
+    amenity: Text
+    # Left unset (not defaulted) so apply_amenity_gap can fill them from the index
+    estimated_roi: Optional[Text] = None
+    priority: Optional[Text] = None
+    reasoning: Text = ""
+
+
+class AmenityAnalysis(_Section):
+    high_roi_additions: Annotated[List[Annotated[AmenityAddition, BeforeValidator(_coerce_item("amenity"))]],
+                                  BeforeValidator(_coerce_list)] = []
+
+
+class ActionItem(_Section):
+    action: Text
+    impact: Text = "medium"
+    effort: Text = "moderate"
+    why: Text = ""
+
+
+ActionItems = Annotated[List[Annotated[ActionItem, BeforeValidator(_coerce_item("action"))]],
+                        BeforeValidator(_coerce_list)]
+
+
+# ==================== FULL RESULT ====================
+class AuditResult(_Section):
+    overall_score: Score
+    overall_explanation: Text = ""
+    detailed_scores: DetailedScores
+    optimized_titles: OptimizedTitles
+    description_rewrite: DescriptionRewrite
+    amenity_analysis: AmenityAnalysis = AmenityAnalysis()
+    immediate_action_items: ActionItems = []
+    critical_warnings: TextList = []
+
+
+# Field name -> annotation with its validators, for building partial adapters
+FIELD_TYPES = get_type_hints(AuditResult, include_extras=True)
+
+AUDIT_RESULT = TypeAdapter(AuditResult)
+
+
+class MalformedOutputError(Exception):
+    """Model output that isn't a valid audit; kind is "truncated", "parse" or "incomplete" """
+
+    def __init__(self, kind: str, message: str):
+        super().__init__(message)
+        self.kind = kind
+
+
+@lru_cache(maxsize=None)
+def audit_adapter(required_fields: tuple) -> TypeAdapter:
+    """
+    Adapter for a result that must contain required_fields
+    Every other audit field is optional and left out when the model didn't return it
+    """
+    if set(required_fields) == {name for name, field in AuditResult.model_fields.items() if field.is_required()}:
+        return AUDIT_RESULT
+
+    fields = {}
+    for name, annotation in FIELD_TYPES.items():
+        if name in required_fields:
+            fields[name] = (annotation, ...)
+        elif name == "overall_explanation" and "overall_score" in required_fields:
+            fields[name] = (annotation, "")
+        else:
+            fields[name] = (Optional[annotation], None)
+    return TypeAdapter(create_model("AuditPart", __base__=_Section, **fields))
+
+
+def _describe(errors: list) -> str:
+    described = []
+    for error in errors[:5]:
+        location = ".".join(str(part) for part in error["loc"]) or "response"
+        described.append(f"{location}: {error['msg']}")
+    more = f" (+{len(errors) - 5} more)" if len(errors) > 5 else ""
+    return "; ".join(described) + more
+
+
+def parse_audit_json(text: str, required_fields) -> dict:
+    """
+    Parse and validate raw model output in one pass
+    Returns a plain dict with defaults filled in, raises MalformedOutputError saying exactly what's wrong
+    """
+    adapter = audit_adapter(tuple(required_fields))
+    try:
+        validated = adapter.validate_json(text)
+    except ValidationError as e:
+        errors = e.errors(include_url=False)
+        if errors and errors[0]["type"] == "json_invalid":
+            kind = "truncated" if "EOF" in errors[0]["msg"] else "parse"
+            raise MalformedOutputError(kind, errors[0]["msg"])
+        missing = [".".join(str(p) for p in error["loc"]) for error in errors if error["type"] == "missing"]
+        if missing and len(missing) == len(errors):
+            raise MalformedOutputError("incomplete", f"Incomplete response - missing: {', '.join(missing)}")
+        raise MalformedOutputError("incomplete", f"Malformed response - {_describe(errors)}")
+
+    return adapter.dump_python(validated, exclude_none=True)
@@ -1,12 +1,38 @@
 import json
+import time
+import asyncio
+import zlib
+import base64
+import copy
+import uuid
+import traceback
+import pydantic_core
 from groq import Groq
-from app.config import GROQ_API_KEY, GROQ_MODELS
+from app.config import GROQ_API_KEY, LLM_PROVIDER, AUDIT_MODE, PARALLEL_SECTION_RETRIES, WRITE_BEHIND_ENABLED, \
+    RETRY_PAUSE_SECONDS, MIN_LLM_ATTEMPT_SECONDS, DB_WRITE_RESERVE_SECONDS, LLM_CALL_TIMEOUT_SECONDS
+from app.services import llm_recorder, deadline
+from app.services.deadline import DeadlineExceededError
+from app.services.usage_tracker import usage_tracker
 from app.database import supabase, ensure_user_subscription
+from app.services.audit_schema import parse_audit_json, MalformedOutputError
+from app.services.audit_prompts import build_audit_prompt, build_section_prompt, SCORE_SCHEMAS
+from app.services.model_router import model_router, classify_error
+from app.services.amenity_index import amenity_gap as compute_amenity_gap, canonical_amenity
+from app.services.seo_index import score_title, validate_titles
+from app.services.similarity_cache import guest_preview_cache
+from app.services.write_buffer import write_buffer
+from app.services.analytics_service import update_rollups
+from app.services.account_cache import invalidate_user
 
 # Configure Groq
 groq_client = None
-if GROQ_API_KEY:
-    groq_client = Groq(api_key=GROQ_API_KEY)
+if LLM_PROVIDER == "mock":
+    from app.services.mock_llm import MockLLMClient
+    groq_client = MockLLMClient()
+    print("✓ Mock LLM provider enabled (offline)")
+elif GROQ_API_KEY:
+    # No hidden SDK retries - generate_json retries itself, within the request deadline
+    groq_client = Groq(api_key=GROQ_API_KEY, max_retries=0)
     print("✓ Groq API configured")
 else:
     print("⚠ Groq API key not found")
@@ -21,6 +47,15 @@ def clean_json_response(text: str) -> str:
         text = text[:-3]
     return text.strip()
 
+def compress_result(result: dict) -> str:
+    """Compress an audit result into a compact base64 string for storage"""
+    raw = pydantic_core.to_json(result)
+    return base64.b64encode(zlib.compress(raw, 9)).decode("ascii")
+
+def decompress_result(blob: str) -> dict:
+    """Restore an audit result stored with compress_result"""
+    return pydantic_core.from_json(zlib.decompress(base64.b64decode(blob)))
+
 class ValidationError(Exception):
     """Custom exception for validation errors"""
     pass
@@ -33,6 +68,340 @@ class AIServiceError(Exception):
     """Custom exception for AI service failures"""
     pass
 
+class TokenBudgetError(Exception):
+    """Custom exception for users over their plan's daily token budget"""
+    pass
+
+AUDIT_REQUIRED_FIELDS = ["overall_score", "detailed_scores", "optimized_titles", "description_rewrite"]
+
+def generate_json(prompt: str, required_fields: list, max_tokens: int = 8192) -> dict:
+    """
+    Run a prompt through the Groq model fallback chain
+    Models are tried in the order the router picks from their recent latency and failures
+    Returns the first complete JSON response, raises AIServiceError if every model fails
+    """
+    if not groq_client:
+        print("❌ Groq client not configured")
+        raise AIServiceError("AI service is not configured. Please contact support.")
+    
+    result = None
+    last_error = None
+    
+    for model_name in model_router.ordered_models():
+        try:
+            print(f"🤖 Attempting with Groq model: {model_name}")
+            
+            # Retry logic for connection errors
+            max_retries = 2
+            chat_completion = None
+            
+            for attempt in range(max_retries):
+                # Leave enough of the request's budget for saving the result
+                deadline.check(f"a call to {model_name}", MIN_LLM_ATTEMPT_SECONDS, DB_WRITE_RESERVE_SECONDS)
+                left = deadline.remaining(DB_WRITE_RESERVE_SECONDS)
+                call_timeout = LLM_CALL_TIMEOUT_SECONDS if left is None else min(left, LLM_CALL_TIMEOUT_SECONDS)
+                
+                started = time.monotonic()
+                try:
+                    chat_completion = groq_client.chat.completions.create(
+                        messages=[
+                            {
+                                "role": "user",
+                                "content": prompt
+                            }
+                        ],
+                        model=model_name,
+                        temperature=0.3,
+                        max_tokens=max_tokens,
+                        top_p=0.8,
+                        timeout=call_timeout
+                    )
+                    call_latency = time.monotonic() - started
+                    usage_tracker.record_call(model_name, call_latency, getattr(chat_completion, "usage", None))
+                    llm_recorder.record_call(model_name, prompt, required_fields, max_tokens, call_latency,
+                                             response=chat_completion.choices[0].message.content,
+                                             usage=getattr(chat_completion, "usage", None))
+                    break  # Success, exit retry loop
+                except Exception as conn_error:
+                    error_msg = str(conn_error)
+                    usage_tracker.record_call(model_name, time.monotonic() - started, failed=True)
+                    llm_recorder.record_call(model_name, prompt, required_fields, max_tokens,
+                                             time.monotonic() - started, error=conn_error)
+                    
+                    # Cut short by the request's budget - not the model's fault
+                    if deadline.expired(DB_WRITE_RESERVE_SECONDS):
+                        print(f"   ⏱ {model_name} call cut off by the request deadline")
+                        raise DeadlineExceededError(f"Deadline reached during a call to {model_name}") from conn_error
+                    
+                    failure = classify_error(conn_error)
+                    model_router.record_failure(model_name, failure, time.monotonic() - started)
+                    
+                    # Skip deprecated models immediately
+                    if "decommissioned" in error_msg.lower() or "deprecated" in error_msg.lower():
+                        print(f"   ⚠ Model deprecated, skipping")
+                        raise  # Don't retry deprecated models
+                    
+                    # A model that just timed out would likely do it again - spend the time on the next one
+                    if failure == "timeout":
+                        raise
+                    
+                    if attempt < max_retries - 1:
+                        print(f"   🔄 Retry {attempt + 1}/{max_retries} due to: {error_msg[:100]}")
+                        deadline.check(f"a retry of {model_name}", RETRY_PAUSE_SECONDS + MIN_LLM_ATTEMPT_SECONDS,
+                                       DB_WRITE_RESERVE_SECONDS)
+                        time.sleep(RETRY_PAUSE_SECONDS)  # Brief pause before retry
+                        continue
+                    else:
+                        raise  # Final attempt failed
+            
+            if not chat_completion:
+                continue
+            
+            response_text = clean_json_response(chat_completion.choices[0].message.content.strip())
+            
+            print(f"📝 Response length: {len(response_text)} chars")
+            print(f"📝 Response preview: {response_text[:200]}...")
+            
+            # Parse + validate against the audit schema in one pass
+            try:
+                parsed = parse_audit_json(response_text, required_fields)
+            except MalformedOutputError as e:
+                print(f"⚠ Malformed response from {model_name} ({e.kind}): {str(e)[:300]}")
+                if e.kind != "incomplete":
+                    print(f"   Response end: ...{response_text[-200:]}")
+                last_error = "AI returned invalid JSON format" if e.kind == "parse" else str(e)
+                model_router.record_failure(model_name, e.kind, call_latency)
+                continue
+            
+            print(f"✓ Success with {model_name} in {call_latency:.1f}s")
+            model_router.record_success(model_name, call_latency)
+            result = parsed
+            break
+        
+        except DeadlineExceededError:
+            raise
+        except Exception as e:
+            error_str = str(e)
+            print(f"✗ Failed with {model_name}: {error_str[:200]}")
+            
+            # Skip deprecated models faster
+            if "decommissioned" in error_str.lower() or "deprecated" in error_str.lower():
+                print(f"   ⏭ Skipping deprecated model")
+                continue
+            
+            last_error = error_str
+            continue
+    
+    # If all models failed, raise error
+    if not result:
+        print("❌ All AI models failed")
+        print(f"❌ Last error: {last_error}")
+        
+        error_msg = "Our AI analysis service is temporarily unavailable. Please try again in a moment."
+        if last_error:
+            if "rate limit" in str(last_error).lower():
+                error_msg = "Too many requests. Please wait a moment and try again."
+            elif "timeout" in str(last_error).lower():
+                error_msg = "Analysis timed out. Please try again with a shorter description."
+            elif "connection" in str(last_error).lower():
+                error_msg = "Network issue. Please check your connection and try again."
+            elif "decommissioned" in str(last_error).lower():
+                error_msg = "AI models are being updated. Please try again in a few minutes."
+        
+        raise AIServiceError(error_msg)
+    
+    return result
+
+# ==================== PARALLEL (DECOMPOSED) GENERATION ====================
+# Independent parts of the audit, each with its own small token cap
+# Parts that aren't required fall back to an empty value if they keep failing
+AUDIT_PARTS = {
+    "scores": {"scores": list(SCORE_SCHEMAS), "sections": ["critical_warnings"], "overall": True,
+               "max_tokens": 1536, "required": True},
+    "titles": {"scores": [], "sections": ["optimized_titles"], "overall": False,
+               "max_tokens": 512, "required": True},
+    "rewrite": {"scores": [], "sections": ["description_rewrite"], "overall": False,
+                "max_tokens": 2048, "required": True},
+    "amenities": {"scores": [], "sections": ["amenity_analysis"], "overall": False,
+                  "max_tokens": 512, "required": False, "default": {"high_roi_additions": []}},
+    "actions": {"scores": [], "sections": ["immediate_action_items"], "overall": False,
+                "max_tokens": 768, "required": False, "default": []}
+}
+
+async def _generate_part(name: str, spec: dict, prompt: str) -> dict:
+    """Generate one audit part in a worker thread, retrying it alone on failure"""
+    required_fields = (["overall_score", "detailed_scores"] if spec["overall"] else []) + spec["sections"]
+    last_error = None
+    
+    for attempt in range(PARALLEL_SECTION_RETRIES + 1):
+        try:
+            started = time.monotonic()
+            part = await asyncio.to_thread(generate_json, prompt, required_fields, spec["max_tokens"])
+            print(f"✓ Part '{name}' done in {time.monotonic() - started:.1f}s")
+            return part
+        except AIServiceError as e:
+            last_error = e
+            print(f"⚠ Part '{name}' failed (attempt {attempt + 1}): {e}")
+        except DeadlineExceededError as e:
+            # Out of time - an optional part still falls back, so the audit isn't lost over it
+            last_error = e
+            print(f"⏱ Part '{name}' stopped by the request deadline")
+            break
+    
+    if spec["required"]:
+        raise last_error
+    
+    print(f"⚠ Part '{name}' skipped - using empty default")
+    return {section: spec["default"] for section in spec["sections"]}
+
+async def generate_audit_parallel(title: str, description: str, property_type: str,
+                                  target_audience: str, amenities_list: list, amenity_gap: dict = None,
+                                  seo_signal: dict = None) -> dict:
+    """
+    Split the audit into independent prompts and run them concurrently
+    Returns the same result schema as the single-prompt audit
+    """
+    tasks = []
+    for name, spec in AUDIT_PARTS.items():
+        prompt = build_section_prompt(title, description, property_type, target_audience, amenities_list,
+                                      spec["scores"], spec["sections"], include_overall=spec["overall"],
+                                      amenity_gap=amenity_gap, seo_signal=seo_signal)
+        tasks.append(_generate_part(name, spec, prompt))
+    
+    parts = await asyncio.gather(*tasks)
+    
+    result = {}
+    for part in parts:
+        result.update(part)
+    
+    # Keep the same key order as the single-prompt result
+    order = ["overall_score", "overall_explanation", "detailed_scores", "optimized_titles", "description_rewrite",
+             "amenity_analysis", "immediate_action_items", "critical_warnings"]
+    return {key: result[key] for key in order if key in result}
+
+def apply_amenity_gap(result: dict, amenity_gap: dict) -> dict:
+    """
+    Fill the amenity sections from the local index
+    ROI and priority come from the index, the model only supplies the reasoning
+    """
+    shortlist = {item["amenity"]: item for item in amenity_gap["shortlist"]}
+    
+    analysis = result.get("amenity_analysis")
+    if not isinstance(analysis, dict):
+        analysis = {}
+    additions = [item for item in analysis.get("high_roi_additions") or [] if isinstance(item, dict)]
+    
+    for item in additions:
+        known = shortlist.get(canonical_amenity(item.get("amenity")))
+        if known:
+            item.setdefault("estimated_roi", known["estimated_roi"])
+            item.setdefault("priority", known["priority"])
+        item.setdefault("estimated_roi", "varies")
+        item.setdefault("priority", "medium")
+    
+    if not additions:
+        additions = [
+            dict(item, reasoning=f"One of the highest-ROI amenities for this property type and audience that the listing doesn't mention yet.")
+            for item in amenity_gap["shortlist"]
+        ]
+    
+    analysis["high_roi_additions"] = additions
+    result["amenity_analysis"] = analysis
+    
+    coverage = result.get("detailed_scores", {}).get("amenity_coverage")
+    if isinstance(coverage, dict) and not coverage.get("critical_missing"):
+        coverage["critical_missing"] = amenity_gap["critical_missing"]
+    
+    return result
+
+def apply_seo_signal(result: dict, seo_signal: dict, description: str) -> dict:
+    """
+    Attach the local keyword-index scores and sanity-check the model's SEO output
+    Generated titles are scored too, so over-long or keyword-free titles are visible
+    """
+    title_scores = validate_titles(result.get("optimized_titles"), description)
+    result["local_seo"] = {
+        "current_title": seo_signal,
+        "optimized_titles": title_scores
+    }
+    
+    too_long = [key for key, score in title_scores.items() if score["length"] > score["max_length"]]
+    if too_long:
+        print(f"⚠ Generated titles over the length limit: {too_long}")
+    
+    model_seo = result.get("detailed_scores", {}).get("seo_optimization")
+    if isinstance(model_seo, dict) and isinstance(model_seo.get("score"), (int, float)):
+        if abs(model_seo["score"] - seo_signal["score"]) > 35:
+            print(f"⚠ Model SEO score {model_seo['score']} far from local score {seo_signal['score']}")
+    
+    return result
+
+def save_audit(user_id: str, listing_input: dict, result: dict):
+    """
+    Insert an audit_history row with the full compressed result
+    The id is generated here so the row can be written behind the response
+    Returns the new audit id
+    """
+    stored = dict(result)
+    stored["listing_input"] = listing_input
+    
+    audit_data = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "listing_title": listing_input["title"][:255],
+        "property_type": listing_input["property_type"],
+        "score": result.get("overall_score", 0),
+        "result_data": compress_result(stored)
+    }
+    
+    if WRITE_BEHIND_ENABLED:
+        # Rollups are folded in by the flush hook once the row is committed
+        write_buffer.enqueue("audit_history", audit_data)
+    else:
+        supabase.table("audit_history").insert(audit_data).execute()
+        try:
+            update_rollups([audit_data])
+        except Exception as e:
+            print(f"⚠ Failed to update score rollups: {e}")
+    return audit_data["id"]
+
+write_buffer.on_flush("audit_history", update_rollups)
+
+
+def deduct_credit(user_id: str, credits_before: int) -> int:
+    """Spend one audit credit after a saved (re-)audit; returns the credits left"""
+    try:
+        subscription = ensure_user_subscription(user_id, None)
+        if not subscription:
+            print(f"⚠ Could not fetch subscription for credit deduction")
+            return 0
+        credits_after = max(0, credits_before - 1)
+        supabase.table("user_subscriptions")\
+            .update({"audits_remaining": credits_after})\
+            .eq("user_id", user_id)\
+            .execute()
+        print(f"✓ Credit deducted: {credits_before} → {credits_after}")
+        return credits_after
+    except Exception as e:
+        print(f"❌ Error deducting credit: {e}")
+        return 0
+
+
+async def charge_credit(user_id: str, credits_before: int) -> int:
+    """
+    deduct_credit in a worker thread, waited on only until the deadline
+    The audit is already saved, so the charge always goes through - if it's still
+    running at the deadline it finishes in the background and the expected balance is returned
+    """
+    charge = asyncio.ensure_future(asyncio.to_thread(deduct_credit, user_id, credits_before))
+    left = deadline.remaining()
+    done, _ = await asyncio.wait({charge}, timeout=max(left, 0.0) if left is not None else None)
+    if charge in done:
+        return charge.result()
+    print(f"⏱ Deadline: credit deduction for {user_id} still running, finishing in the background")
+    return max(0, credits_before - 1)
+
+
 async def analyze_listing(title: str, description: str, property_type: str,
                          target_audience: str, amenities: str, user_id: str = None):
     """
@@ -65,6 +434,11 @@ async def analyze_listing(title: str, description: str, property_type: str,
     if not amenities_list:
         amenities_list = ["No specific amenities listed"]
     
+    seo_signal = score_title(title, description)
+    amenity_gap = compute_amenity_gap(property_type, target_audience, amenities)
+    print(f"🔎 Local title score: {seo_signal['score']}/100")
+    print(f"🧰 Amenity index: {len(amenity_gap['present'])} recognised, shortlist {[i['amenity'] for i in amenity_gap['shortlist']]}")
+    
     # ==================== USER TYPE & CREDIT CHECK ====================
     # Fix: Better guest detection - handle None, empty string, and "null" string
     is_guest = (user_id is None or user_id == "" or user_id == "null" or str(user_id).strip() == "")
@@ -75,7 +449,7 @@ async def analyze_listing(title: str, description: str, property_type: str,
     
     # For authenticated users, check credits BEFORE running AI
     if not is_guest and supabase:
-        subscription = ensure_user_subscription(user_id, None)
+        subscription = await deadline.run("checking your credits", ensure_user_subscription, user_id, None)
         
         if not subscription:
             print(f"❌ Failed to verify subscription for user {user_id}")
@@ -91,250 +465,63 @@ async def analyze_listing(title: str, description: str, property_type: str,
         if credits_before <= 0:
             print(f"❌ User {user_id} has 0 credits - BLOCKING AUDIT")
             raise InsufficientCreditsError("You've used all your audit credits. Purchase more to continue optimizing your listings!")
+        
+        remaining_tokens = await deadline.run("checking your token budget", usage_tracker.remaining_budget,
+                                              user_id, plan)
+        if remaining_tokens is not None and remaining_tokens <= 0:
+            print(f"❌ User {user_id} is over the {plan} daily token budget - BLOCKING AUDIT")
+            raise TokenBudgetError("You've reached today's AI usage limit for your plan. Please try again tomorrow.")
     else:
         print(f"👤 Guest user - unlimited previews allowed (results will be blurred)")
+        
+        # Same listing with trivial edits? Serve the recent preview instead of a new generation
+        cached = guest_preview_cache.lookup(title, description, property_type, target_audience, amenities)
+        if cached:
+            cached_result, match_score = cached
+            print(f"♻️ Guest preview served from similarity cache ({match_score:.2f} match)")
+            result = copy.deepcopy(cached_result)
+            result["is_preview"] = True
+            result["credits_remaining"] = None
+            result["from_cache"] = True
+            return result
+    
+    listing_input = {
+        "title": title,
+        "description": description,
+        "property_type": property_type,
+        "target_audience": target_audience,
+        "amenities": amenities
+    }
     
     # ==================== AI ANALYSIS (for BOTH guests and authenticated) ====================
     try:
-        system_prompt = f"""You are a BRUTAL but FAIR Airbnb listing critic with 15 years of experience. You give harsh truth when deserved, but you also recognize genuinely excellent work.
-
-LISTING TO ANALYZE:
-
-Title: {title}
-Description: {description}
-Property Type: {property_type}
-Target Audience: {target_audience}
-Current Amenities: {', '.join(amenities_list)}
-
-Return this EXACT JSON structure:
-{{
-  "overall_score": <0-100>,
-  "overall_explanation": "2-3 sentences of HONEST assessment - harsh if bad, praise if genuinely good",
-  "detailed_scores": {{
-    "seo_optimization": {{"score": <0-100>, "explanation": "honest feedback", "recommendations": "specific fixes based ONLY on what user provided"}},
-    "emotional_appeal": {{"score": <0-100>, "explanation": "fair assessment", "improvements": "what's wrong or what's right"}},
-    "description_quality": {{"score": <0-100>, "word_count": <actual count>, "structure_issues": ["real issues found"], "strengths": ["genuine strengths if any"]}},
-    "amenity_coverage": {{"score": <0-100>, "critical_missing": ["amenities that would help THIS property type and audience"]}},
-    "target_audience_alignment": {{"score": <0-100>, "recommendations": "fix targeting based on actual content"}},
-    "booking_conversion_potential": {{"score": <0-100>, "friction_points": ["real dealbreakers from the listing"]}}
-  }},
-  "optimized_titles": {{
-    "seo_focused": "keyword-rich title using ONLY info user provided - no beach/mountain/downtown unless they mentioned it",
-    "emotional_focused": "emotion-driven title based on ACTUAL listing features",
-    "click_optimized": "curiosity title using REAL property details",
-    "audience_specific": "title for {target_audience} using ONLY verified info"
-  }},
-  "description_rewrite": {{
-    "full_rewrite": "400-word rewrite in PLAIN TEXT using ONLY the information provided. No assumptions about location, views, or amenities not mentioned. If user said 'no kids', work with that truthfully. No markdown, no asterisks.",
-    "hook_section": "compelling opening using REAL details from listing",
-    "key_improvements": ["actual fixes applied to their specific listing"]
-  }},
-  "amenity_analysis": {{
-    "high_roi_additions": [
-      {{"amenity": "realistic addition for THIS property", "estimated_roi": "honest estimate", "priority": "critical/high/medium", "reasoning": "why this makes sense for {property_type} targeting {target_audience}"}}
-    ]
-  }},
-  "immediate_action_items": [
-    {{"action": "specific task based on their ACTUAL listing", "impact": "critical/high/medium", "effort": "quick-win/moderate/significant", "why": "realistic expected outcome"}}
-  ],
-  "critical_warnings": ["severe issues if found - empty array if listing is actually good"]
-}}
-
-CRITICAL: Return ONLY valid JSON. No explanations before or after. Ensure all JSON is complete and properly closed.
-
-BRUTAL BUT HONEST SCORING CRITERIA - BE EXTREMELY HARSH:
-
-0-10: Complete disaster. Fatal contradictions, offensive content, or essentially empty.
-  Example: Title "not good" + description "get away" = 8/100 (CATASTROPHIC - essentially no information)
-  Example: "No kids" + targeting families = 3/100
-
-11-20: Catastrophically bad. One or two word titles, near-empty descriptions that provide ZERO useful information.
-  Example: Title "cozy", description "apartment" = 15/100
-  Example: Title "place", description "for rent" = 12/100
-
-21-35: Terrible. Extremely minimal effort, missing all basics, provides almost no value.
-  Example: "Nice place downtown. Has bed." = 28/100
-
-36-50: Very poor. Generic, lazy, missing critical information.
-  Example: "Comfortable apartment with kitchen and wifi in the city" = 45/100
-
-51-65: Below average to average. Bare minimum effort, forgettable.
-  Example: Decent description but generic title, no emotional appeal = 60/100
-
-66-75: Slightly above average. Shows some effort but unremarkable.
-  Example: Basic SEO + structured description = 70/100
-
-76-85: Good. Solid work, clear effort, above most competitors.
-  Example: SEO-optimized title + structured description + some storytelling = 80/100
-
-86-92: Excellent. Professional-grade. Strong SEO + emotion + targeting.
-  Example: Keyword-rich title + emotional narrative + perfect audience alignment = 89/100
-
-93-100: EXCEPTIONAL. Masterclass in optimization. Reserve 95-100 for truly PERFECT listings.
-  Example: "Luxury Downtown Loft | Chef's Kitchen | Rooftop Deck | 2min to Metro" + vivid storytelling description + perfect amenity showcase = 97/100
-
-CRITICAL SCORING RULES - ENFORCE STRICTLY:
-
-- IF TITLE IS 1-3 WORDS: Maximum score is 20/100, no exceptions
-- IF DESCRIPTION IS UNDER 20 WORDS: Maximum score is 25/100, no exceptions
-- IF TITLE + DESCRIPTION PROVIDE ESSENTIALLY NO INFO: Maximum score is 10/100
-- TARGET AUDIENCE MISMATCH: Maximum score is 15/100
-- NO PROPERTY DETAILS PROVIDED: Maximum score is 30/100
-
-CRITICAL RULES FOR SUGGESTIONS:
-
-NEVER ASSUME LOCATION DETAILS
-- Don't say "near beach" unless they mentioned water/ocean/beach
-- Don't say "mountain views" unless they said mountains/views/elevation
-- Don't say "downtown" unless they said downtown/city center/central
-- Use ONLY what they gave you: property type, their amenities, their description
-
-WORK WITH WHAT THEY HAVE
-- If they said "no kids policy" - make that a SELLING POINT for couples/professionals
-- If amenities are basic - optimize what exists, don't invent amenities
-- If description is short - expand on details THEY provided, don't fabricate
-
-BE HONEST ABOUT EXCELLENCE
-- If a listing truly has perfect SEO + emotion + structure + targeting → give 90+
-- Don't artificially inflate scores for terrible listings
-
-REALISTIC AMENITY SUGGESTIONS
-- For studio apartments: suggest coffee maker, not hot tub
-- For budget properties: suggest smart lock, not pool
-- For urban: suggest workspace, not kayaks
-- Base ALL suggestions on property_type and target_audience
-
-RESPONSE FORMAT:
-- Use PLAIN TEXT in descriptions (NO **, NO *, NO markdown)
-- Be BRUTALLY HONEST in scores and explanations
-- If listing is garbage, give it 5-15
-- If listing is perfect, give it 95-100
-- Return ONLY valid, complete JSON (no code blocks, no truncation)
-
-Remember: Your job is TRUTH. A 2-word title and 2-word description is a DISASTER and deserves 5-15 maximum.
-"""
+        recording = llm_recorder.begin_audit(listing_input, AUDIT_MODE, is_guest)
+        usage = usage_tracker.begin(user_id, "guest_preview" if is_guest else "audit")
+        try:
+            if AUDIT_MODE == "parallel":
+                print(f"⚡ Parallel audit: {len(AUDIT_PARTS)} section prompts")
+                result = await generate_audit_parallel(title, description, property_type, target_audience,
+                                                       amenities_list, amenity_gap, seo_signal)
+            else:
+                system_prompt = build_audit_prompt(title, description, property_type, target_audience,
+                                                   amenities_list, amenity_gap, seo_signal)
+                # Blocking Groq call - keep it off the event loop
+                result = await asyncio.to_thread(generate_json, system_prompt, AUDIT_REQUIRED_FIELDS)
+        except Exception as e:
+            llm_recorder.end_audit(recording, {"status": "failed", "error": str(e)})
+            raise
+        finally:
+            await usage_tracker.end_audit(usage)
+        llm_recorder.end_audit(recording, {"status": "ok", "overall_score": result.get("overall_score")})
         
-        if not groq_client:
-            print("❌ Groq client not configured")
-            raise AIServiceError("AI service is not configured. Please contact support.")
-        
-        result = None
-        last_error = None
-        
-        for model_name in GROQ_MODELS:
-            try:
-                print(f"🤖 Attempting with Groq model: {model_name}")
-                
-                # Retry logic for connection errors
-                max_retries = 2
-                chat_completion = None
-                
-                for attempt in range(max_retries):
-                    try:
-                        chat_completion = groq_client.chat.completions.create(
-                            messages=[
-                                {
-                                    "role": "user",
-                                    "content": system_prompt
-                                }
-                            ],
-                            model=model_name,
-                            temperature=0.3,
-                            max_tokens=8192,  # Increased to prevent truncation
-                            top_p=0.8,
-                        )
-                        break  # Success, exit retry loop
-                    except Exception as conn_error:
-                        error_msg = str(conn_error)
-                        
-                        # Skip deprecated models immediately
-                        if "decommissioned" in error_msg.lower() or "deprecated" in error_msg.lower():
-                            print(f"   ⚠ Model deprecated, skipping")
-                            raise  # Don't retry deprecated models
-                        
-                        if attempt < max_retries - 1:
-                            print(f"   🔄 Retry {attempt + 1}/{max_retries} due to: {error_msg[:100]}")
-                            import time
-                            time.sleep(1)  # Brief pause before retry
-                            continue
-                        else:
-                            raise  # Final attempt failed
-                
-                if not chat_completion:
-                    continue
-                
-                response_text = clean_json_response(chat_completion.choices[0].message.content.strip())
-                
-                print(f"📝 Response length: {len(response_text)} chars")
-                print(f"📝 Response preview: {response_text[:200]}...")
-                
-                # Validate JSON is complete
-                if not response_text.endswith('}'):
-                    print(f"⚠ Response appears truncated (doesn't end with }})")
-                    print(f"   Last 100 chars: ...{response_text[-100:]}")
-                    last_error = "Response truncated"
-                    continue
-                
-                # Count braces to ensure JSON is balanced
-                open_braces = response_text.count('{')
-                close_braces = response_text.count('}')
-                if open_braces != close_braces:
-                    print(f"⚠ Unbalanced braces: {open_braces} open, {close_braces} close")
-                    last_error = "Unbalanced JSON braces"
-                    continue
-                
-                result = json.loads(response_text)
-                
-                # Validate required fields
-                required_fields = ["overall_score", "detailed_scores", "optimized_titles", "description_rewrite"]
-                if all(field in result for field in required_fields):
-                    print(f"✓ Success with {model_name}")
-                    break
-                else:
-                    missing = [f for f in required_fields if f not in result]
-                    print(f"⚠ Missing fields: {missing}")
-                    last_error = f"Incomplete response - missing: {', '.join(missing)}"
-                    continue
-                    
-            except json.JSONDecodeError as e:
-                print(f"✗ JSON parse error with {model_name}: {e}")
-                if 'response_text' in locals():
-                    print(f"   Response start: {response_text[:300]}")
-                    print(f"   Response end: ...{response_text[-300:]}")
-                last_error = f"AI returned invalid JSON format"
-                continue
-            except Exception as e:
-                error_str = str(e)
-                print(f"✗ Failed with {model_name}: {error_str[:200]}")
-                
-                # Skip deprecated models faster
-                if "decommissioned" in error_str.lower() or "deprecated" in error_str.lower():
-                    print(f"   ⏭ Skipping deprecated model")
-                    continue
-                
-                last_error = error_str
-                continue
-        
-        # If all models failed, raise error
-        if not result:
-            print("❌ All AI models failed")
-            print(f"❌ Last error: {last_error}")
-            
-            error_msg = "Our AI analysis service is temporarily unavailable. Please try again in a moment."
-            if last_error:
-                if "rate limit" in str(last_error).lower():
-                    error_msg = "Too many requests. Please wait a moment and try again."
-                elif "timeout" in str(last_error).lower():
-                    error_msg = "Analysis timed out. Please try again with a shorter description."
-                elif "connection" in str(last_error).lower():
-                    error_msg = "Network issue. Please check your connection and try again."
-                elif "decommissioned" in str(last_error).lower():
-                    error_msg = "AI models are being updated. Please try again in a few minutes."
-            
-            raise AIServiceError(error_msg)
+        result = apply_amenity_gap(result, amenity_gap)
+        result = apply_seo_signal(result, seo_signal, description)
         
         # ==================== HANDLE GUEST vs AUTHENTICATED ====================
         if is_guest:
+            guest_preview_cache.store(title, description, property_type, target_audience,
+                                      copy.deepcopy(result), amenities)
+            
             # Guest gets preview mode - show scores but mark as preview
             result["is_preview"] = True
             result["credits_remaining"] = None
@@ -343,35 +530,19 @@ Remember: Your job is TRUTH. A 2-word title and 2-word description is a DISASTER
         else:
             # Authenticated user - save audit and deduct credit
             if supabase:
+                # Nobody is waiting for a result past the deadline - don't save or charge for it.
+                # Once started the save is always awaited, so an audit that gets saved also gets charged
+                deadline.check("saving the audit", DB_WRITE_RESERVE_SECONDS / 2)
                 try:
-                    audit_data = {
-                        "user_id": user_id,
-                        "listing_title": title[:255],
-                        "property_type": property_type,
-                        "score": result.get("overall_score", 0)
-                    }
-                    supabase.table("audit_history").insert(audit_data).execute()
+                    result["audit_id"] = await asyncio.to_thread(save_audit, user_id, listing_input, result)
                     print(f"✓ Audit saved for user {user_id}")
                 except Exception as e:
                     print(f"⚠ Failed to save audit history: {e}")
                 
-                try:
-                    subscription = ensure_user_subscription(user_id, None)
-                    if subscription:
-                        credits_after = max(0, credits_before - 1)
-                        supabase.table("user_subscriptions")\
-                            .update({"audits_remaining": credits_after})\
-                            .eq("user_id", user_id)\
-                            .execute()
-                        print(f"✓ Credit deducted: {credits_before} → {credits_after}")
-                    else:
-                        print(f"⚠ Could not fetch subscription for credit deduction")
-                        credits_after = 0
-                except Exception as e:
-                    print(f"❌ Error deducting credit: {e}")
-                    credits_after = 0
+                credits_after = await charge_credit(user_id, credits_before)
                 
                 result["credits_remaining"] = credits_after
+                invalidate_user(user_id)
                 result["is_preview"] = False
                 print(f"📤 Authenticated user - full access, credits remaining: {credits_after}")
         
@@ -381,10 +552,191 @@ Remember: Your job is TRUTH. A 2-word title and 2-word description is a DISASTER
         raise
     except InsufficientCreditsError:
         raise
+    except TokenBudgetError:
+        raise
+    except DeadlineExceededError:
+        raise
     except AIServiceError:
         raise
     except Exception as e:
         print(f"❌ Unexpected error: {e}")
-        import traceback
         traceback.print_exc()
-        raise AIServiceError("Analysis failed unexpectedly. Please try again in a moment.")
\ No newline at end of file
+        raise AIServiceError("Analysis failed unexpectedly. Please try again in a moment.")
+
+
+def load_audit_row(audit_id: str, user_id: str):
+    """The user's audit_history row, or None"""
+    # Just saved and not flushed yet?
+    row = write_buffer.find("audit_history", "id", audit_id)
+    if row:
+        return row if row.get("user_id") == user_id else None
+    
+    audit = supabase.table("audit_history")\
+        .select("id, listing_title, property_type, score, created_at, result_data")\
+        .eq("id", audit_id)\
+        .eq("user_id", user_id)\
+        .limit(1)\
+        .execute()
+    return audit.data[0] if audit.data else None
+
+
+async def get_audit(audit_id: str, user_id: str):
+    """
+    Load a saved audit with its full result - no AI call, no credit spent
+    Returns None if the audit doesn't exist or belongs to another user
+    """
+    if not supabase:
+        raise Exception("Service not configured")
+    
+    # Not an id we could have generated - Postgres would reject it as invalid uuid syntax
+    try:
+        uuid.UUID(audit_id)
+    except ValueError:
+        return None
+    
+    row = await deadline.run("loading the audit", load_audit_row, audit_id, user_id)
+    if not row:
+        return None
+    
+    if not row.get("result_data"):
+        print(f"⚠ Audit {audit_id} was saved without a full result")
+        return None
+    
+    result = decompress_result(row["result_data"])
+    result["audit_id"] = row["id"]
+    result["created_at"] = row.get("created_at")
+    result["is_preview"] = False
+    return result
+
+
+# ==================== INCREMENTAL RE-AUDIT ====================
+# Which parts of the audit depend on each listing field
+REAUDIT_SECTIONS = {
+    "title": {
+        "scores": ["seo_optimization"],
+        "sections": ["optimized_titles"]
+    },
+    "description": {
+        "scores": ["seo_optimization", "emotional_appeal", "description_quality"],
+        "sections": ["description_rewrite"]
+    },
+    "amenities": {
+        "scores": ["amenity_coverage"],
+        "sections": ["amenity_analysis"]
+    },
+    "target_audience": {
+        "scores": ["target_audience_alignment"],
+        "sections": ["optimized_titles", "amenity_analysis"]
+    }
+}
+
+async def reaudit_listing(audit_id: str, user_id: str, field: str, value: str):
+    """
+    Re-audit a saved listing after one field changed
+    Only the sections that depend on that field are regenerated, the rest is merged from the saved audit
+    Costs one audit credit, like a full audit
+    """
+    if field not in REAUDIT_SECTIONS:
+        raise ValidationError(f"Can't re-audit field '{field}'. Choose one of: {', '.join(REAUDIT_SECTIONS)}")
+    
+    if field in ("title", "description") and (not value or not value.strip()):
+        raise ValidationError(f"Please enter a listing {field}")
+    
+    previous = await get_audit(audit_id, user_id)
+    if not previous:
+        return None
+    
+    subscription = await deadline.run("checking your credits", ensure_user_subscription, user_id)
+    if not subscription:
+        print(f"❌ Failed to verify subscription for user {user_id}")
+        raise Exception("Unable to verify your account. Please contact support.")
+    
+    credits_before = subscription.get("audits_remaining", 0)
+    plan = subscription.get("plan", "free")
+    if credits_before <= 0:
+        print(f"❌ User {user_id} has 0 credits - BLOCKING RE-AUDIT")
+        raise InsufficientCreditsError("You've used all your audit credits. Purchase more to continue optimizing your listings!")
+    
+    remaining_tokens = await deadline.run("checking your token budget", usage_tracker.remaining_budget,
+                                          user_id, plan)
+    if remaining_tokens is not None and remaining_tokens <= 0:
+        raise TokenBudgetError("You've reached today's AI usage limit for your plan. Please try again tomorrow.")
+    
+    listing_input = previous.pop("listing_input", None)
+    if not listing_input:
+        raise ValidationError("This audit was saved before re-audits were available. Please run a full audit.")
+    
+    for key in ("audit_id", "created_at", "is_preview"):
+        previous.pop(key, None)
+    
+    if field == "target_audience":
+        value = value.strip() if value and value.strip() else "All Audiences"
+    else:
+        value = (value or "").strip()
+    
+    listing_input = dict(listing_input)
+    listing_input[field] = value
+    
+    amenities_list = [a.strip() for a in listing_input["amenities"].split(",") if a.strip()]
+    if not amenities_list:
+        amenities_list = ["No specific amenities listed"]
+    
+    affected = REAUDIT_SECTIONS[field]
+    amenity_gap = compute_amenity_gap(listing_input["property_type"], listing_input["target_audience"],
+                                      listing_input["amenities"])
+    seo_signal = score_title(listing_input["title"], listing_input["description"])
+    print(f"🔁 Re-audit of {audit_id} after '{field}' change: {affected['scores'] + affected['sections']}")
+    
+    previous_scores = {
+        key: data.get("score") for key, data in previous.get("detailed_scores", {}).items()
+        if key not in affected["scores"] and isinstance(data, dict)
+    }
+    context = f"""The host only changed the {field.replace('_', ' ')} since the last audit.
+Unchanged category scores from the last audit: {json.dumps(previous_scores)}
+Previous overall score: {previous.get('overall_score')}. Give a new overall score that reflects the change."""
+    
+    prompt = build_section_prompt(
+        listing_input["title"], listing_input["description"], listing_input["property_type"],
+        listing_input["target_audience"], amenities_list,
+        affected["scores"], affected["sections"], include_overall=True, context=context,
+        amenity_gap=amenity_gap, seo_signal=seo_signal
+    )
+    max_tokens = 4096 if "description_rewrite" in affected["sections"] else 1536
+    usage = usage_tracker.begin(user_id, "reaudit")
+    try:
+        partial = await asyncio.to_thread(generate_json, prompt, ["overall_score", "detailed_scores"] + affected["sections"],
+                                          max_tokens)
+    finally:
+        await usage_tracker.end_audit(usage)
+    
+    # ==================== MERGE ====================
+    result = previous
+    result["overall_score"] = partial["overall_score"]
+    if partial.get("overall_explanation"):
+        result["overall_explanation"] = partial["overall_explanation"]
+    
+    detailed_scores = dict(result.get("detailed_scores", {}))
+    for key in affected["scores"]:
+        if key in partial["detailed_scores"]:
+            detailed_scores[key] = partial["detailed_scores"][key]
+    result["detailed_scores"] = detailed_scores
+    
+    for key in affected["sections"]:
+        result[key] = partial[key]
+    
+    if "amenity_analysis" in affected["sections"]:
+        result = apply_amenity_gap(result, amenity_gap)
+    result = apply_seo_signal(result, seo_signal, listing_input["description"])
+    
+    deadline.check("saving the re-audit", DB_WRITE_RESERVE_SECONDS / 2)
+    try:
+        result["audit_id"] = await asyncio.to_thread(save_audit, user_id, listing_input, result)
+        print(f"✓ Re-audit saved for user {user_id}")
+    except Exception as e:
+        print(f"⚠ Failed to save re-audit: {e}")
+    
+    result["credits_remaining"] = await charge_credit(user_id, credits_before)
+    invalidate_user(user_id)
+    result["listing_input"] = listing_input
+    result["is_preview"] = False
+    return result
@@ -1,10 +1,20 @@
+import asyncio
+from app.config import SELF_HOSTED
 from app.database import supabase, ensure_user_subscription
 from datetime import datetime
+from fastapi import BackgroundTasks
+
+
+def _defer(background_tasks: BackgroundTasks) -> bool:
+    # Background tasks only run after the response on a long-lived server - on Vercel the
+    # lambda awaits them inside the same call, so deferring would save nothing there
+    return background_tasks is not None and SELF_HOSTED
 
 
 async def record_tos_acceptance(user_id: str, email: str, ip_address: str = None):
     """
     Record TOS acceptance in database with user_id, email, version, timestamp, and IP
+    Always written directly - a consent record must not sit in an in-memory queue
     """
     if not supabase:
         print(f"⚠ Supabase not configured - cannot record TOS acceptance")
@@ -19,7 +29,7 @@ async def record_tos_acceptance(user_id: str, email: str, ip_address: str = None
             "ip_address": ip_address
         }
         
-        result = supabase.table("tos_acceptances").insert(tos_record).execute()
+        result = await asyncio.to_thread(supabase.table("tos_acceptances").insert(tos_record).execute)
         
         if result.data:
             print(f"✓ TOS acceptance recorded for user {user_id} (IP: {ip_address})")
@@ -33,8 +43,28 @@ async def record_tos_acceptance(user_id: str, email: str, ip_address: str = None
         return False
 
 
-async def signup_user(email: str, password: str, tos_accepted: bool = False, ip_address: str = None):
-    """Sign up new user with subscription and TOS acceptance tracking"""
+def confirm_subscription(user_id: str, email: str):
+    """Make sure a returning user has a subscription row (idempotent)"""
+    subscription = ensure_user_subscription(user_id, email)
+    
+    if subscription:
+        print(f"✓ Subscription confirmed for user {user_id}")
+        print(f"   Plan: {subscription.get('plan')}")
+        print(f"   Credits: {subscription.get('audits_remaining')}")
+    else:
+        print(f"⚠ Warning: Subscription check failed for {user_id}")
+    
+    return subscription
+
+
+async def signup_user(email: str, password: str, tos_accepted: bool = False, ip_address: str = None,
+                      background_tasks: BackgroundTasks = None):
+    """
+    Sign up new user with subscription and TOS acceptance tracking
+    Self-hosted with background_tasks, the subscription is provisioned after the response;
+    otherwise it's provisioned concurrently with the TOS record, which is always awaited -
+    it's the proof of consent
+    """
     if not supabase:
         raise Exception("Authentication not configured")
     
@@ -44,7 +74,7 @@ async def signup_user(email: str, password: str, tos_accepted: bool = False, ip_
     email = email.strip().lower()
     print(f"📝 Signup attempt for: {email}")
     
-    auth_response = supabase.auth.sign_up({
+    auth_response = await asyncio.to_thread(supabase.auth.sign_up, {
         "email": email,
         "password": password
     })
@@ -53,16 +83,15 @@ async def signup_user(email: str, password: str, tos_accepted: bool = False, ip_
         user_id = auth_response.user.id
         print(f"✓ User created with ID: {user_id}")
         
-        # Ensure subscription is created
-        subscription = ensure_user_subscription(user_id, email)
-        
-        if subscription:
-            print(f"✓ Subscription confirmed for new user {user_id}")
+        # Subscription (idempotent, and ensured again by every page that needs it)
+        if _defer(background_tasks):
+            background_tasks.add_task(confirm_subscription, user_id, email)
+            tos_recorded = await record_tos_acceptance(user_id, email, ip_address)
         else:
-            print(f"⚠ Subscription creation may have failed for {user_id}")
-        
-        # Record TOS acceptance in database
-        tos_recorded = await record_tos_acceptance(user_id, email, ip_address)
+            tos_recorded, _ = await asyncio.gather(
+                record_tos_acceptance(user_id, email, ip_address),
+                asyncio.to_thread(confirm_subscription, user_id, email)
+            )
         
         if not tos_recorded:
             print(f"⚠ WARNING: TOS acceptance recording failed for {user_id} - account created but TOS not logged")
@@ -79,15 +108,19 @@ async def signup_user(email: str, password: str, tos_accepted: bool = False, ip_
     raise Exception("Signup failed")
 
 
-async def login_user(email: str, password: str):
-    """Login user with subscription guarantee"""
+async def login_user(email: str, password: str, background_tasks: BackgroundTasks = None):
+    """
+    Login user with subscription guarantee
+    Self-hosted with background_tasks, the subscription check is deferred so login is a single
+    auth round-trip (every page that needs the subscription ensures it too)
+    """
     if not supabase:
         raise Exception("Authentication not configured")
     
     email = email.strip().lower()
     print(f"🔐 Login attempt for: {email}")
     
-    auth_response = supabase.auth.sign_in_with_password({
+    auth_response = await asyncio.to_thread(supabase.auth.sign_in_with_password, {
         "email": email,
         "password": password
     })
@@ -97,14 +130,10 @@ async def login_user(email: str, password: str):
         print(f"✓ User authenticated: {email} (ID: {user_id})")
         
         # ALWAYS ensure subscription exists on every login
-        subscription = ensure_user_subscription(user_id, email)
-        
-        if subscription:
-            print(f"✓ Subscription confirmed for user {user_id}")
-            print(f"   Plan: {subscription.get('plan')}")
-            print(f"   Credits: {subscription.get('audits_remaining')}")
+        if _defer(background_tasks):
+            background_tasks.add_task(confirm_subscription, user_id, email)
         else:
-            print(f"⚠ Warning: Subscription check failed for {user_id}")
+            await asyncio.to_thread(confirm_subscription, user_id, email)
         
         return auth_response.session.access_token
     
@@ -0,0 +1,60 @@
+"""
+Per-request time budget for audits
+The route sets a deadline once; it travels in a context variable into the worker
+threads of parallel parts, and every step (model attempt, retry pause, database
+call) checks what's left before starting and caps its own timeout to it.
+"""
+import time
+import asyncio
+import contextvars
+
+# Absolute time.monotonic() the current request must answer by (None = no budget)
+_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceededError(Exception):
+    """The request's time budget ran out before the next step could finish"""
+    pass
+
+
+def begin(seconds: float):
+    """Start a budget of `seconds` for this context; returns a token for end()"""
+    return _deadline.set(time.monotonic() + seconds)
+
+
+def end(token):
+    _deadline.reset(token)
+
+
+def remaining(reserve: float = 0.0):
+    """Seconds left minus reserve (what later steps still need), or None without a budget"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic() - reserve
+
+
+def check(step: str, needed: float = 0.0, reserve: float = 0.0):
+    """Raise before starting a step that needs `needed` seconds but wouldn't fit"""
+    left = remaining(reserve)
+    if left is not None and left < needed:
+        print(f"⏱ Deadline: {max(left, 0):.1f}s left, skipping {step}")
+        raise DeadlineExceededError(f"Not enough time left for {step}")
+
+
+def expired(reserve: float = 0.0) -> bool:
+    left = remaining(reserve)
+    return left is not None and left <= 0
+
+
+async def run(step: str, func, *args, reserve: float = 0.0):
+    """
+    Run a blocking call (a database query) in a worker thread, waiting no longer than the budget allows
+    A thread can't be cancelled - past the deadline the call finishes in the background, unawaited
+    """
+    check(step, reserve=reserve)
+    try:
+        return await asyncio.wait_for(asyncio.to_thread(func, *args), remaining(reserve))
+    except asyncio.TimeoutError:
+        print(f"⏱ Deadline: ran out of time {step}")
+        raise DeadlineExceededError(f"Ran out of time {step}")
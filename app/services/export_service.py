@@ -0,0 +1,121 @@
+"""
+Streaming export of a user's audit history as CSV or JSONL
+Rows are read in keyset-paginated pages (created_at, id) and written out page by
+page, so memory stays flat and the first bytes go out before the first query,
+however many audits a user has.
+"""
+import io
+import csv
+import pydantic_core
+from datetime import datetime
+from app.database import supabase
+from app.services.audit_service import decompress_result
+from app.services.audit_prompts import SCORE_SCHEMAS
+from app.services.write_buffer import write_buffer
+
+EXPORT_PAGE_SIZE = 500
+FORMATS = {
+    "csv": "text/csv",   # Starlette adds the charset
+    "jsonl": "application/x-ndjson"
+}
+CSV_COLUMNS = ["audit_id", "created_at", "listing_title", "property_type", "overall_score"] + \
+    [f"{key}_score" for key in SCORE_SCHEMAS]
+
+
+def export_filename(fmt: str) -> str:
+    return f"occupancyos-audits-{datetime.utcnow():%Y-%m-%d}.{fmt}"
+
+
+# ==================== PAGING ====================
+def iter_audit_pages(user_id: str, page_size: int = EXPORT_PAGE_SIZE):
+    """Yield the user's audit_history rows oldest first, one page at a time"""
+    last = None
+    while True:
+        query = supabase.table("audit_history")\
+            .select("id, listing_title, property_type, score, created_at, result_data")\
+            .eq("user_id", user_id)
+        if last:
+            # Keyset instead of offset - every page is an index range scan, not a skip of all earlier rows
+            query = query.or_(f'created_at.gt."{last["created_at"]}",'
+                              f'and(created_at.eq."{last["created_at"]}",id.gt.{last["id"]})')
+        page = query\
+            .order("created_at")\
+            .order("id")\
+            .limit(page_size)\
+            .execute()
+
+        rows = page.data or []
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        last = rows[-1]
+
+
+def _full_result(row: dict) -> dict:
+    if not row.get("result_data"):
+        return {}
+    try:
+        return decompress_result(row["result_data"])
+    except Exception as e:
+        print(f"⚠ Unreadable result_data in audit {row['id']}: {e}")
+        return {}
+
+
+# ==================== FORMATS ====================
+def _csv_safe(value):
+    # Titles come from users - don't let a spreadsheet run them as formulas
+    if isinstance(value, str) and value[:1] in ("=", "+", "-", "@"):
+        return "'" + value
+    return value
+
+
+def _csv_row(row: dict) -> list:
+    scores = _full_result(row).get("detailed_scores", {})
+    values = [row["id"], row.get("created_at"), _csv_safe(row.get("listing_title")),
+              row.get("property_type"), row.get("score")]
+    for key in SCORE_SCHEMAS:
+        score = scores.get(key)
+        values.append(score.get("score") if isinstance(score, dict) else None)
+    return values
+
+
+def _jsonl_line(row: dict) -> str:
+    result = _full_result(row)
+    result.pop("is_preview", None)
+    record = {"audit_id": row["id"], "created_at": row.get("created_at"),
+              "listing_title": row.get("listing_title"), "property_type": row.get("property_type"),
+              "overall_score": row.get("score"), **result}
+    return pydantic_core.to_json(record).decode() + "\n"
+
+
+def stream_export(user_id: str, fmt: str):
+    """
+    Generator of export chunks (one per page) - for a StreamingResponse
+    Runs in a worker thread, so the blocking Supabase calls don't hold up the event loop
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(CSV_COLUMNS)
+        yield buffer.getvalue()
+
+    # Include audits saved a moment ago that are still in the write-behind buffer
+    write_buffer.flush()
+
+    exported = 0
+    try:
+        for rows in iter_audit_pages(user_id):
+            if fmt == "csv":
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(_csv_row(row) for row in rows)
+                yield buffer.getvalue()
+            else:
+                yield "".join(_jsonl_line(row) for row in rows)
+            exported += len(rows)
+    except Exception as e:
+        # Headers are already sent - abort the download so it isn't mistaken for a complete file
+        print(f"❌ Export for user {user_id} failed after {exported} audits: {e}")
+        raise
+    print(f"✓ Exported {exported} audits as {fmt} for user {user_id}")
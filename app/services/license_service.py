@@ -2,6 +2,12 @@ import requests
 from datetime import datetime
 from app.config import GUMROAD_ACCESS_TOKEN, GUMROAD_PRODUCT_ID
 from app.database import supabase, ensure_user_subscription
+from app.services.account_cache import invalidate_user
+
+GUMROAD_VERIFY_URL = "https://api.gumroad.com/v2/licenses/verify"
+
+# One keep-alive session instead of a new TLS handshake per license call
+gumroad_session = requests.Session()
 
 
 def verify_gumroad_license(license_key: str) -> dict:
@@ -26,8 +32,8 @@ def verify_gumroad_license(license_key: str) -> dict:
             "access_token": GUMROAD_ACCESS_TOKEN
         }
         
-        response = requests.post(
-            "https://api.gumroad.com/v2/licenses/verify",
+        response = gumroad_session.post(
+            GUMROAD_VERIFY_URL,
             data=payload,
             timeout=10
         )
@@ -97,8 +103,8 @@ def increment_gumroad_license_uses(license_key: str) -> bool:
     try:
         print(f"📝 Incrementing license uses in Gumroad: {license_key}")
         
-        response = requests.post(
-            "https://api.gumroad.com/v2/licenses/verify",
+        response = gumroad_session.post(
+            GUMROAD_VERIFY_URL,
             data={
                 "product_id": GUMROAD_PRODUCT_ID,
                 "license_key": license_key,
@@ -203,6 +209,8 @@ async def redeem_license(license_key: str, user_id: str, email: str):
         print(f"   Previous credits: {current_credits}")
         print(f"   New total: {new_total}")
         
+        invalidate_user(user_id)
+        
         return {
             "credits_added": credits_to_add,
             "new_total": new_total
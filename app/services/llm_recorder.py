@@ -0,0 +1,121 @@
+"""
+Opt-in recorder of audit inputs and raw model responses (LLM_RECORD_DIR)
+Each audit becomes one JSONL line: the anonymized listing input plus every model call
+made for it (model, requested sections, raw response or error, latency, token usage).
+The corpus is replayed offline by app/replay.py.
+"""
+import os
+import re
+import json
+import uuid
+import random
+import hashlib
+import threading
+import contextvars
+from datetime import datetime
+from app.config import LLM_RECORD_DIR, LLM_RECORD_SAMPLE_RATE
+
+# The audit being recorded in this context - shared with the worker threads of parallel parts
+_session = contextvars.ContextVar("llm_recording", default=None)
+_write_lock = threading.Lock()
+
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_URL = re.compile(r"(?:https?://|www\.)\S+", re.I)
+_PHONE = re.compile(r"\+?\d[\d\s().-]{7,}\d")
+_SCHEMA = re.compile(r"JSON structure:\n(.*?)\n\nCRITICAL:", re.S)
+_TOP_LEVEL_KEY = re.compile(r'^  "(\w+)":', re.M)
+
+
+def anonymize(text: str) -> str:
+    """Strip contact details hosts sometimes paste into listings"""
+    if not text:
+        return text
+    text = _EMAIL.sub("[email]", text)
+    text = _URL.sub("[url]", text)
+    return _PHONE.sub("[phone]", text)
+
+
+def prompt_sections(prompt: str) -> list:
+    """Top-level result keys a prompt's JSON structure asks for - identifies the call on replay"""
+    match = _SCHEMA.search(prompt)
+    return sorted(_TOP_LEVEL_KEY.findall(match.group(1))) if match else []
+
+
+def is_enabled() -> bool:
+    return bool(LLM_RECORD_DIR)
+
+
+# ==================== RECORDING ====================
+def begin_audit(listing_input: dict, mode: str, is_guest: bool):
+    """Start recording the model calls of one audit; returns a token for end_audit (None if not sampled)"""
+    if not LLM_RECORD_DIR or random.random() >= LLM_RECORD_SAMPLE_RATE:
+        return None
+    session = {
+        "id": str(uuid.uuid4()),
+        "recorded_at": datetime.utcnow().isoformat(),
+        "mode": mode,
+        "is_guest": is_guest,
+        "input": {key: anonymize(value) for key, value in listing_input.items()},
+        "calls": []
+    }
+    return _session.set(session)
+
+
+def record_call(model: str, prompt: str, required_fields, max_tokens: int, latency: float,
+                response: str = None, usage=None, error: Exception = None):
+    session = _session.get()
+    if session is None:
+        return
+    call = {
+        "model": model,
+        "sections": prompt_sections(prompt),
+        "required_fields": list(required_fields),
+        "max_tokens": max_tokens,
+        "prompt_chars": len(prompt),
+        "prompt_hash": hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16],
+        "latency": round(latency, 3)
+    }
+    if error is not None:
+        call["error"] = anonymize(str(error))[:500]
+    else:
+        call["response"] = anonymize(response)
+    if usage is not None:
+        call["usage"] = {
+            "prompt_tokens": getattr(usage, "prompt_tokens", None),
+            "completion_tokens": getattr(usage, "completion_tokens", None)
+        }
+    session["calls"].append(call)
+
+
+def end_audit(token, outcome: dict):
+    """Write the recorded audit with its outcome ({"status": "ok" | "failed", ...})"""
+    if token is None:
+        return
+    session = _session.get()
+    _session.reset(token)
+    if session is None:
+        return
+
+    session["outcome"] = outcome
+    path = os.path.join(LLM_RECORD_DIR, f"audits-{datetime.utcnow():%Y-%m-%d}.jsonl")
+    try:
+        os.makedirs(LLM_RECORD_DIR, exist_ok=True)
+        line = json.dumps(session, ensure_ascii=False)
+        with _write_lock:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        print(f"🎙 Recorded audit {session['id']} ({len(session['calls'])} model calls)")
+    except Exception as e:
+        print(f"⚠ Failed to record audit: {e}")
+
+
+def load_corpus(path: str) -> list:
+    """Recorded audits from a .jsonl file or a directory of them"""
+    files = [path] if os.path.isfile(path) else sorted(
+        os.path.join(path, name) for name in os.listdir(path) if name.endswith(".jsonl")
+    )
+    records = []
+    for file in files:
+        with open(file, encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    return records
@@ -0,0 +1,126 @@
+"""
+Offline stand-in for the Groq client (LLM_PROVIDER=mock)
+Lets the audit pipeline and model routing be exercised without an API key or quota
+
+Per-model behaviour comes from MOCK_LLM_BEHAVIOR, e.g.
+    MOCK_LLM_BEHAVIOR="llama-3.3-70b-versatile=timeout,llama-3.1-8b-instant=truncate"
+Behaviours: ok, timeout, rate_limit, deprecated, error, truncate, invalid_json
+"""
+import os
+import re
+import json
+import time
+from types import SimpleNamespace
+
+MOCK_RESULT = {
+    "overall_score": 58,
+    "overall_explanation": "Mock audit: the listing covers the basics but the title is generic and the description lacks structure.",
+    "detailed_scores": {
+        "seo_optimization": {"score": 52, "explanation": "Few search keywords in the title.", "recommendations": "Lead with the property type and a standout amenity."},
+        "emotional_appeal": {"score": 55, "explanation": "Mostly factual.", "improvements": "Describe how a stay feels."},
+        "description_quality": {"score": 60, "word_count": 120, "structure_issues": ["One long paragraph"], "strengths": ["Honest tone"]},
+        "amenity_coverage": {"score": 62, "critical_missing": ["Dedicated workspace"]},
+        "target_audience_alignment": {"score": 57, "recommendations": "Speak directly to the target guests."},
+        "booking_conversion_potential": {"score": 59, "friction_points": ["No check-in details"]}
+    },
+    "optimized_titles": {
+        "seo_focused": "Bright Apartment | Fast WiFi | Full Kitchen",
+        "emotional_focused": "Your Calm, Sunlit Home Base",
+        "click_optimized": "The Apartment Guests Keep Rebooking",
+        "audience_specific": "Work-Ready Apartment With Fast WiFi"
+    },
+    "description_rewrite": {
+        "full_rewrite": "Mock rewrite. Settle into a bright, comfortable space with everything you need for an easy stay.",
+        "hook_section": "Settle into a bright, comfortable space.",
+        "key_improvements": ["Added a hook", "Split into short paragraphs"]
+    },
+    "amenity_analysis": {
+        "high_roi_additions": [
+            {"amenity": "Dedicated workspace", "estimated_roi": "+8% bookings", "priority": "high", "reasoning": "Remote workers filter for it."}
+        ]
+    },
+    "immediate_action_items": [
+        {"action": "Rewrite the title with keywords", "impact": "high", "effort": "quick-win", "why": "Better search placement"}
+    ],
+    "critical_warnings": []
+}
+
+DEFAULT_LATENCY = 0.05
+
+
+def _parse_behavior(spec: str) -> dict:
+    behavior = {}
+    for item in spec.split(","):
+        if "=" in item:
+            model, mode = item.split("=", 1)
+            behavior[model.strip()] = mode.strip().lower()
+    return behavior
+
+
+class MockChatCompletions:
+    def __init__(self, client):
+        self._client = client
+
+    def create(self, messages, model, max_tokens=8192, **kwargs):
+        client = self._client
+        client.calls.append(model)
+        mode = client.behavior.get(model, "ok")
+        latency = client.latency.get(model, client.default_latency)
+        timeout = kwargs.get("timeout")
+        if timeout is not None and latency > timeout:
+            time.sleep(max(timeout, 0))
+            raise Exception("Request timed out (mock)")
+        time.sleep(latency)
+
+        if mode == "timeout":
+            raise Exception("Request timed out (mock)")
+        if mode == "rate_limit":
+            raise Exception("Error code: 429 - rate limit reached (mock)")
+        if mode == "deprecated":
+            raise Exception(f"The model {model} has been decommissioned (mock)")
+        if mode == "error":
+            raise Exception("Internal server error (mock)")
+
+        prompt = messages[-1]["content"]
+        content = json.dumps(self._requested_sections(prompt))
+        if mode == "truncate":
+            content = content[:len(content) // 2]
+        elif mode == "invalid_json":
+            content = content.replace('":', '" ', 1)
+
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason="stop")],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                  total_tokens=prompt_tokens + completion_tokens),
+            model=model
+        )
+
+    @staticmethod
+    def _requested_sections(prompt: str) -> dict:
+        """Answer only the top-level sections the prompt's JSON structure asks for"""
+        match = re.search(r"JSON structure:\n(.*?)\n\nCRITICAL:", prompt, re.S)
+        schema = match.group(1) if match else ""
+        requested = {key for key in MOCK_RESULT if f'"{key}"' in schema}
+        if not requested:
+            return dict(MOCK_RESULT)
+
+        result = {key: MOCK_RESULT[key] for key in MOCK_RESULT if key in requested}
+        if "detailed_scores" in result:
+            result["detailed_scores"] = {
+                key: value for key, value in MOCK_RESULT["detailed_scores"].items() if f'"{key}"' in schema
+            }
+        return result
+
+
+class MockLLMClient:
+    """Duck-types groq.Groq: client.chat.completions.create(...)"""
+
+    def __init__(self, behavior: dict = None, latency: dict = None, default_latency: float = None):
+        self.behavior = behavior if behavior is not None else _parse_behavior(os.getenv("MOCK_LLM_BEHAVIOR", ""))
+        self.latency = latency or {}
+        self.default_latency = default_latency if default_latency is not None else float(
+            os.getenv("MOCK_LLM_LATENCY", DEFAULT_LATENCY))
+        self.calls = []
+        self.chat = SimpleNamespace(completions=MockChatCompletions(self))
@@ -0,0 +1,169 @@
+import time
+import threading
+from app.config import (
+    GROQ_MODELS, ROUTER_EWMA_ALPHA, ROUTER_DEFAULT_LATENCY,
+    BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN_SECONDS
+)
+
+# ==================== CIRCUIT BREAKER STATES ====================
+CLOSED = "closed"        # Model is healthy, route normally
+OPEN = "open"            # Model keeps failing, skip it until the cooldown ends
+HALF_OPEN = "half_open"  # Cooldown ended, let one probe request through
+
+# A half-open probe that never reports back (e.g. an earlier model answered first) is released after this
+PROBE_WINDOW_SECONDS = 30.0
+
+# Failure kinds tracked separately so we can see WHY a model is unhealthy
+FAILURE_KINDS = ("error", "timeout", "rate_limit", "truncated", "parse", "incomplete", "deprecated")
+
+
+class ModelStats:
+    """Rolling statistics and breaker state for one model"""
+
+    def __init__(self, name: str, position: int):
+        self.name = name
+        self.position = position  # Configured order, used as a tie-breaker
+        self.samples = 0
+        self.latency_samples = 0
+        self.ewma_latency = ROUTER_DEFAULT_LATENCY
+        self.success_rate = 1.0
+        self.failure_rates = {kind: 0.0 for kind in FAILURE_KINDS}
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.cooldown = BREAKER_COOLDOWN_SECONDS
+        self.probe_started = None
+
+    def expected_cost(self) -> float:
+        """Latency we should expect per successful call"""
+        return self.ewma_latency / max(self.success_rate, 0.05)
+
+    def to_dict(self) -> dict:
+        return {
+            "model": self.name,
+            "state": self.state,
+            "samples": self.samples,
+            "ewma_latency": round(self.ewma_latency, 3),
+            "success_rate": round(self.success_rate, 3),
+            "failure_rates": {kind: round(rate, 3) for kind, rate in self.failure_rates.items()},
+            "consecutive_failures": self.consecutive_failures
+        }
+
+
+class ModelRouter:
+    """
+    Latency-aware model ordering with per-model circuit breakers
+    Thread-safe - parallel audits record results from worker threads
+    """
+
+    def __init__(self, models: list):
+        self._lock = threading.Lock()
+        self._stats = {name: ModelStats(name, i) for i, name in enumerate(models)}
+
+    def ordered_models(self) -> list:
+        """
+        Models to try for the next call, best first
+        Open breakers are skipped, a half-open one gets a single probe per window
+        """
+        now = time.monotonic()
+        with self._lock:
+            available = []
+            for stats in self._stats.values():
+                if stats.state == OPEN and now - stats.opened_at >= stats.cooldown:
+                    stats.state = HALF_OPEN
+                    stats.probe_started = None
+                    print(f"🔌 Breaker half-open for {stats.name} - allowing a probe")
+
+                if stats.state == CLOSED:
+                    available.append(stats)
+                elif stats.state == HALF_OPEN:
+                    if stats.probe_started is None or now - stats.probe_started >= PROBE_WINDOW_SECONDS:
+                        stats.probe_started = now
+                        available.append(stats)
+
+            if not available:
+                # Every breaker is open - try the one closest to reopening rather than failing outright
+                soonest = min(self._stats.values(), key=lambda s: s.opened_at + s.cooldown - now)
+                print(f"⚠ All model breakers open - forcing a probe of {soonest.name}")
+                available.append(soonest)
+
+            # A due probe goes first so a recovered model actually gets traffic again,
+            # healthy models follow cheapest first
+            available.sort(key=lambda s: (s.state == CLOSED, s.expected_cost(), s.position))
+            return [stats.name for stats in available]
+
+    def record_success(self, model: str, latency: float):
+        with self._lock:
+            stats = self._stats.get(model)
+            if not stats:
+                return
+            self._update(stats, latency, None)
+            stats.consecutive_failures = 0
+            stats.probe_started = None
+            if stats.state != CLOSED:
+                print(f"🔌 Breaker closed for {model}")
+            stats.state = CLOSED
+            stats.cooldown = BREAKER_COOLDOWN_SECONDS
+
+    def record_failure(self, model: str, kind: str, latency: float = None):
+        with self._lock:
+            stats = self._stats.get(model)
+            if not stats:
+                return
+            self._update(stats, latency, kind)
+            stats.consecutive_failures += 1
+            stats.probe_started = None
+
+            if kind == "deprecated":
+                # Won't come back on its own - keep it out for a long time
+                self._open(stats, BREAKER_COOLDOWN_SECONDS * 60)
+            elif stats.state == HALF_OPEN:
+                # Probe failed - back off harder before the next one
+                self._open(stats, min(stats.cooldown * 2, BREAKER_COOLDOWN_SECONDS * 16))
+            elif stats.consecutive_failures >= BREAKER_FAILURE_THRESHOLD:
+                self._open(stats, BREAKER_COOLDOWN_SECONDS)
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [stats.to_dict() for stats in self._stats.values()]
+
+    def reset(self):
+        with self._lock:
+            self._stats = {name: ModelStats(name, s.position) for name, s in self._stats.items()}
+
+    def _update(self, stats: ModelStats, latency, failure_kind):
+        alpha = ROUTER_EWMA_ALPHA
+        stats.samples += 1
+        # Fast errors shouldn't make a model look quick - only answers and timeouts count toward latency
+        if latency is not None and failure_kind in (None, "timeout"):
+            stats.latency_samples += 1
+            if stats.latency_samples == 1:
+                stats.ewma_latency = latency
+            else:
+                stats.ewma_latency = alpha * latency + (1 - alpha) * stats.ewma_latency
+        stats.success_rate = alpha * (0.0 if failure_kind else 1.0) + (1 - alpha) * stats.success_rate
+        for kind in FAILURE_KINDS:
+            hit = 1.0 if kind == failure_kind else 0.0
+            stats.failure_rates[kind] = alpha * hit + (1 - alpha) * stats.failure_rates[kind]
+
+    def _open(self, stats: ModelStats, cooldown: float):
+        stats.state = OPEN
+        stats.opened_at = time.monotonic()
+        stats.cooldown = cooldown
+        print(f"🔌 Breaker OPEN for {stats.name} for {cooldown:.0f}s "
+              f"({stats.consecutive_failures} consecutive failures)")
+
+
+def classify_error(error: Exception) -> str:
+    """Map an API exception to a failure kind"""
+    message = str(error).lower()
+    if "decommissioned" in message or "deprecated" in message:
+        return "deprecated"
+    if "timeout" in message or "timed out" in message:
+        return "timeout"
+    if "rate limit" in message or "429" in message:
+        return "rate_limit"
+    return "error"
+
+
+model_router = ModelRouter(GROQ_MODELS)
@@ -0,0 +1,193 @@
+"""
+Local SEO keyword index for instant title scoring
+High-value Airbnb search terms compiled into one Aho-Corasick automaton at import,
+so a title + description is scanned in a single pass without calling the LLM
+"""
+import re
+from collections import deque
+
+# ==================== KEYWORDS ====================
+# weight: how much the term helps search placement / click-through (0-1)
+KEYWORDS = {
+    # Property types
+    "apartment": 0.6, "condo": 0.6, "loft": 0.7, "studio": 0.6, "cabin": 0.8, "cottage": 0.8, "villa": 0.8,
+    "townhouse": 0.6, "tiny house": 0.8, "bungalow": 0.7, "chalet": 0.8, "penthouse": 0.9, "suite": 0.5,
+    "home": 0.4, "house": 0.4, "retreat": 0.7, "hideaway": 0.7, "getaway": 0.7, "oasis": 0.6,
+    # Standout amenities
+    "hot tub": 1.0, "jacuzzi": 0.9, "pool": 1.0, "private pool": 1.0, "sauna": 0.9, "fireplace": 0.9,
+    "king bed": 0.8, "fast wifi": 0.8, "wifi": 0.5, "workspace": 0.8, "office": 0.5, "free parking": 0.8,
+    "parking": 0.5, "full kitchen": 0.7, "kitchen": 0.4, "ev charger": 0.7, "game room": 0.8, "gym": 0.6,
+    "fire pit": 0.8, "bbq": 0.6, "rooftop": 0.9, "balcony": 0.7, "patio": 0.6, "deck": 0.6, "garden": 0.6,
+    "washer": 0.4, "self check-in": 0.6, "pet friendly": 0.9, "dog friendly": 0.9, "ev charging": 0.7,
+    # Location signals (only count when the host wrote them)
+    "downtown": 0.9, "city center": 0.9, "beachfront": 1.0, "oceanfront": 1.0, "ocean view": 1.0,
+    "sea view": 1.0, "lake": 0.8, "lakefront": 1.0, "lake view": 1.0, "mountain view": 1.0,
+    "mountain": 0.7, "waterfront": 1.0, "walk to beach": 1.0, "near beach": 0.8, "beach": 0.7,
+    "ski-in": 1.0, "ski": 0.7, "metro": 0.7, "subway": 0.7, "old town": 0.8, "historic": 0.7,
+    "walkable": 0.7, "central": 0.6, "views": 0.8, "view": 0.6, "forest": 0.7, "river": 0.7,
+    # Audience signals
+    "family": 0.6, "family-friendly": 0.8, "kid friendly": 0.8, "couples": 0.7, "romantic": 0.8,
+    "remote work": 0.8, "digital nomad": 0.7, "business": 0.5, "group": 0.6, "sleeps": 0.7,
+    # Experience / quality words guests search for
+    "luxury": 0.7, "modern": 0.6, "cozy": 0.5, "spacious": 0.6, "bright": 0.5, "quiet": 0.6,
+    "private": 0.7, "renovated": 0.6, "secluded": 0.8, "charming": 0.4, "stylish": 0.5, "new": 0.4,
+}
+
+TITLE_MAX_LENGTH = 50      # Airbnb cuts titles off here
+TITLE_IDEAL_MIN = 32       # Shorter titles waste search real estate
+FRONT_LOAD_CHARS = 20      # Keywords here show before mobile truncation
+SEPARATORS = ("|", "·", "•", " - ", "–", ",")
+
+_NON_WORD = re.compile(r"[^a-z0-9\-' ]+")
+_SPACES = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    return _SPACES.sub(" ", _NON_WORD.sub(" ", (text or "").lower())).strip()
+
+
+# ==================== AHO-CORASICK AUTOMATON ====================
+class KeywordMatcher:
+    """Multi-pattern matcher - finds every keyword in one pass over the text"""
+
+    def __init__(self, keywords):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for keyword in keywords:
+            self._add(keyword)
+        self._build_failure_links()
+
+    def _add(self, keyword: str):
+        node = 0
+        for char in keyword:
+            if char not in self._goto[node]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[node][char] = len(self._goto) - 1
+            node = self._goto[node][char]
+        self._out[node].append(keyword)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find(self, text: str) -> list:
+        """(start index, keyword) for every whole-word keyword occurrence"""
+        matches = []
+        node = 0
+        for i, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for keyword in self._out[node]:
+                start = i - len(keyword) + 1
+                before_ok = start == 0 or not text[start - 1].isalnum()
+                after_ok = i + 1 == len(text) or not text[i + 1].isalnum()
+                if before_ok and after_ok:
+                    matches.append((start, keyword))
+        return matches
+
+
+MATCHER = KeywordMatcher(KEYWORDS)
+
+
+def _keywords_in(text: str) -> dict:
+    """keyword -> first position, dropping keywords contained in a longer match ("hot tub" over "tub")"""
+    found = {}
+    spans = []
+    for start, keyword in sorted(MATCHER.find(text), key=lambda m: (m[0], -len(m[1]))):
+        end = start + len(keyword)
+        if any(s <= start and end <= e for s, e in spans):
+            continue
+        spans.append((start, end))
+        found.setdefault(keyword, start)
+    return found
+
+
+# ==================== SCORING ====================
+def score_title(title: str, description: str = "") -> dict:
+    """
+    Instant local SEO score for a listing title (0-100)
+    Keyword coverage, keyword position, length limits, plus terms from the description the title misses
+    """
+    raw_title = (title or "").strip()
+    normalized = _normalize(raw_title)
+    length = len(raw_title)
+    found = _keywords_in(normalized)
+    issues = []
+
+    # Coverage - the best three keywords carry the title
+    weights = sorted((KEYWORDS[k] for k in found), reverse=True)
+    coverage = min(sum(weights[:3]) / 2.4, 1.0)
+
+    # Position - a strong keyword should show before mobile truncation
+    front_loaded = any(pos < FRONT_LOAD_CHARS and KEYWORDS[k] >= 0.6 for k, pos in found.items())
+
+    # Length
+    if length == 0:
+        length_score = 0.0
+        issues.append("Title is empty")
+    elif length > TITLE_MAX_LENGTH:
+        length_score = 0.0
+        issues.append(f"Title is {length} characters - Airbnb cuts it off after {TITLE_MAX_LENGTH}")
+    elif length < TITLE_IDEAL_MIN:
+        length_score = length / TITLE_IDEAL_MIN
+        issues.append(f"Title only uses {length} of {TITLE_MAX_LENGTH} characters")
+    else:
+        length_score = 1.0
+
+    if not found:
+        issues.append("No high-value search keywords in the title")
+    elif not front_loaded:
+        issues.append(f"Move your strongest keyword into the first {FRONT_LOAD_CHARS} characters")
+
+    words = raw_title.split()
+    if len(words) <= 3:
+        issues.append("Titles of 1-3 words rank and convert poorly")
+    has_separator = any(sep in raw_title for sep in SEPARATORS)
+    if raw_title.isupper() and length > 3:
+        issues.append("Avoid ALL CAPS titles")
+
+    score = 100 * (0.55 * coverage + 0.2 * (1.0 if front_loaded else 0.0) + 0.2 * length_score
+                   + 0.05 * (1.0 if has_separator else 0.0))
+    if len(words) <= 3:
+        score = min(score, 20)
+    if length > TITLE_MAX_LENGTH:
+        score = min(score, 75)
+    if raw_title.isupper() and length > 3:
+        score -= 10
+
+    # Keywords the host already wrote in the description but not in the title
+    missing = []
+    if description:
+        in_description = _keywords_in(_normalize(description))
+        missing = sorted((k for k in in_description if k not in found), key=lambda k: -KEYWORDS[k])[:5]
+
+    return {
+        "score": max(0, min(100, round(score))),
+        "length": length,
+        "max_length": TITLE_MAX_LENGTH,
+        "keywords_found": sorted(found, key=lambda k: found[k]),
+        "front_loaded": front_loaded,
+        "suggested_keywords": missing,
+        "issues": issues
+    }
+
+
+def validate_titles(titles: dict, description: str = "") -> dict:
+    """Score each generated title so bad model output (too long, no keywords) is visible"""
+    scores = {}
+    for key, title in (titles or {}).items():
+        if isinstance(title, str):
+            scores[key] = score_title(title, description)
+    return scores
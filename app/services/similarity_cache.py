@@ -0,0 +1,151 @@
+"""
+Near-duplicate listing cache for guest previews
+MinHash signatures of shingled title + description, bucketed with LSH so a lookup only
+compares against a handful of candidates. Scoped by property type and target audience,
+bounded by size (LRU) and age (TTL).
+"""
+import re
+import time
+import struct
+import hashlib
+import threading
+from collections import OrderedDict
+from app.config import SIMILARITY_THRESHOLD, SIMILARITY_CACHE_SIZE, SIMILARITY_CACHE_TTL
+
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+SHINGLE_SIZE = 3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Fixed permutations so signatures are stable across workers and restarts
+_PERMUTATIONS = [
+    (struct.unpack("<Q", hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest())[0] % (_MERSENNE_PRIME - 1) + 1,
+     struct.unpack("<Q", hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest())[0] % _MERSENNE_PRIME)
+    for i in range(NUM_HASHES)
+]
+
+_NON_WORD = re.compile(r"[^a-z0-9 ]+")
+_SPACES = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    return _SPACES.sub(" ", _NON_WORD.sub(" ", (text or "").lower())).strip()
+
+
+def shingles(title: str, description: str, amenities: str = "") -> set:
+    """Word shingles of the listing text, plus each amenity as its own token"""
+    words = f"{_normalize(title)} | {_normalize(description)}".split()
+    if len(words) < SHINGLE_SIZE:
+        result = {" ".join(words)}
+    else:
+        result = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    result.update(f"amenity:{_normalize(a)}" for a in amenities.split(",") if a.strip())
+    return result
+
+
+def minhash(tokens: set) -> tuple:
+    hashes = [struct.unpack("<Q", hashlib.blake2b(t.encode(), digest_size=8).digest())[0] for t in tokens]
+    return tuple(
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes) if hashes else _MAX_HASH
+        for a, b in _PERMUTATIONS
+    )
+
+
+def similarity(sig_a: tuple, sig_b: tuple) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_HASHES
+
+
+class SimilarityCache:
+    """Bounded, thread-safe near-duplicate index of recent audit results"""
+
+    def __init__(self, max_entries: int = SIMILARITY_CACHE_SIZE, ttl: float = SIMILARITY_CACHE_TTL,
+                 threshold: float = SIMILARITY_THRESHOLD):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # entry id -> (scope, signature, result, stored_at)
+        self._buckets = {}              # (scope, band, band hash) -> set of entry ids
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _scope(property_type: str, target_audience: str) -> str:
+        return f"{_normalize(property_type)}::{_normalize(target_audience)}"
+
+    @staticmethod
+    def _band_keys(scope: str, signature: tuple):
+        for band in range(BANDS):
+            yield (scope, band, signature[band * ROWS:(band + 1) * ROWS])
+
+    def lookup(self, title: str, description: str, property_type: str, target_audience: str,
+               amenities: str = ""):
+        """Best cached result above the similarity threshold, or None"""
+        scope = self._scope(property_type, target_audience)
+        signature = minhash(shingles(title, description, amenities))
+        now = time.monotonic()
+
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(scope, signature):
+                candidates.update(self._buckets.get(key, ()))
+
+            best_id, best_score = None, 0.0
+            for entry_id in candidates:
+                entry_scope, entry_sig, _, stored_at = self._entries[entry_id]
+                if now - stored_at > self.ttl:
+                    continue
+                score = similarity(signature, entry_sig)
+                if score > best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None or best_score < self.threshold:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            return self._entries[best_id][2], best_score
+
+    def store(self, title: str, description: str, property_type: str, target_audience: str,
+              result: dict, amenities: str = ""):
+        scope = self._scope(property_type, target_audience)
+        signature = minhash(shingles(title, description, amenities))
+
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (scope, signature, result, time.monotonic())
+            for key in self._band_keys(scope, signature):
+                self._buckets.setdefault(key, set()).add(entry_id)
+            self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _evict(self):
+        now = time.monotonic()
+        # Oldest-used first: drop expired entries at the front, then anything over the size bound
+        while self._entries:
+            entry_id, (_, _, _, stored_at) = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_entries and now - stored_at <= self.ttl:
+                break
+            self._remove(entry_id)
+
+    def _remove(self, entry_id: int):
+        scope, signature, _, _ = self._entries.pop(entry_id)
+        for key in self._band_keys(scope, signature):
+            bucket = self._buckets.get(key)
+            if bucket:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+
+guest_preview_cache = SimilarityCache()
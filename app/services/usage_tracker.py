@@ -0,0 +1,250 @@
+"""
+Token, latency and cost accounting for every LLM call
+Calls are attributed to the audit being generated (user, kind) through a context
+variable and aggregated in memory per (day, user, kind, model). With the write-behind
+buffer (self-hosted) the deltas are queued for llm_usage every USAGE_FLUSH_INTERVAL
+seconds; without it (Vercel) a frozen lambda may never flush later, so they are
+persisted at the end of each audit, within the request deadline.
+Per-plan daily token budgets are checked before generation starts, against the
+persisted llm_usage totals (re-read every flush interval) plus this process's
+unflushed usage - other workers' usage shows up once they flush, so concurrent
+instances can overshoot a budget by about one flush interval of their usage.
+"""
+import time
+import atexit
+import threading
+import contextvars
+from datetime import datetime, timedelta
+from app.config import MODEL_PRICING, USAGE_FLUSH_INTERVAL, PLAN_TOKEN_BUDGETS, WRITE_BEHIND_ENABLED, \
+    DB_WRITE_RESERVE_SECONDS
+from app.database import supabase
+from app.services import deadline
+from app.services.write_buffer import write_buffer
+
+USAGE_TABLE = "llm_usage"
+SUMMARY_MAX_ROWS = 50000
+
+# (user_id, kind, running totals) of the audit being generated in this context
+_session = contextvars.ContextVar("llm_usage_session", default=None)
+
+
+def _empty() -> dict:
+    return {"audits": 0, "calls": 0, "failures": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            "latency_seconds": 0.0, "cost_usd": 0.0}
+
+
+def _add(totals: dict, delta: dict):
+    for key, value in delta.items():
+        totals[key] = totals.get(key, 0) + value
+
+
+def call_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """USD cost of one call from the per-million-token price list"""
+    input_price, output_price = MODEL_PRICING.get(model, (0.0, 0.0))
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+class UsageTracker:
+
+    def __init__(self, flush_interval: float = USAGE_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending = {}        # (day, user_id, kind, model) -> totals not persisted yet
+        self._totals = {}         # same key -> today's totals in this process
+        self._daily_tokens = {}   # (user_id, day) -> [tokens used, loaded_at], for budgets
+        self._last_flush = time.monotonic()
+
+    # ==================== ATTRIBUTION ====================
+    def begin(self, user_id: str, kind: str):
+        """Attribute the LLM calls that follow (in this context and its worker threads) to one audit"""
+        return _session.set({"user_id": user_id or None, "kind": kind, "totals": _empty()})
+
+    def end(self, token) -> dict:
+        """Close the audit started with begin(); returns its totals"""
+        session = _session.get()
+        _session.reset(token)
+        if session is None:
+            return _empty()
+        self._record(session["user_id"], session["kind"], None, {"audits": 1})
+        totals = session["totals"]
+        print(f"💰 {session['kind']}: {totals['prompt_tokens']}+{totals['completion_tokens']} tokens, "
+              f"${totals['cost_usd']:.5f} over {totals['calls']} calls")
+        return totals
+
+    async def end_audit(self, token) -> dict:
+        """end(), then without write-behind persist the deltas now - in a worker thread, within the deadline"""
+        totals = self.end(token)
+        if not WRITE_BEHIND_ENABLED:
+            try:
+                # Only time the audit's own writes don't need; otherwise it goes out with the next audit
+                await deadline.run("recording LLM usage", self.flush, reserve=DB_WRITE_RESERVE_SECONDS)
+            except deadline.DeadlineExceededError:
+                pass
+        return totals
+
+    # ==================== RECORDING ====================
+    def record_call(self, model: str, latency: float, usage=None, failed: bool = False):
+        """One model call - usage is chat_completion.usage (None when the API call failed)"""
+        session = _session.get()
+        prompt_tokens = (getattr(usage, "prompt_tokens", None) or 0) if usage is not None else 0
+        completion_tokens = (getattr(usage, "completion_tokens", None) or 0) if usage is not None else 0
+        delta = {
+            "calls": 1,
+            "failures": 1 if failed else 0,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "latency_seconds": latency,
+            "cost_usd": call_cost(model, prompt_tokens, completion_tokens)
+        }
+        if session is not None:
+            _add(session["totals"], delta)
+            user_id, kind = session["user_id"], session["kind"]
+        else:
+            user_id, kind = None, "other"
+        self._record(user_id, kind, model, delta)
+
+        # Timed batching only hands rows to the write-behind buffer - never a database call in a model thread
+        if WRITE_BEHIND_ENABLED and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _record(self, user_id, kind: str, model, delta: dict):
+        day = datetime.utcnow().date().isoformat()
+        key = (day, user_id, kind, model)
+        with self._lock:
+            _add(self._pending.setdefault(key, _empty()), delta)
+            _add(self._totals.setdefault(key, _empty()), delta)
+            tokens = delta.get("prompt_tokens", 0) + delta.get("completion_tokens", 0)
+            if user_id and (user_id, day) in self._daily_tokens:
+                self._daily_tokens[(user_id, day)][0] += tokens
+
+    # ==================== PERSISTENCE ====================
+    def flush(self):
+        """Persist the aggregated deltas as one row per (day, user, kind, model)"""
+        today = datetime.utcnow().date().isoformat()
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+            self._last_flush = time.monotonic()
+            # Past days are persisted now - don't keep them in memory forever
+            self._totals = {key: totals for key, totals in self._totals.items() if key[0] >= today}
+            self._daily_tokens = {key: entry for key, entry in self._daily_tokens.items() if key[1] >= today}
+        if not pending or not supabase:
+            return
+
+        rows = [
+            {"day": day, "user_id": user_id, "kind": kind, "model": model,
+             **dict(totals, latency_seconds=round(totals["latency_seconds"], 3),
+                    cost_usd=round(totals["cost_usd"], 6))}
+            for (day, user_id, kind, model), totals in pending.items()
+        ]
+        try:
+            if WRITE_BEHIND_ENABLED:
+                for row in rows:
+                    write_buffer.enqueue(USAGE_TABLE, row)
+            else:
+                supabase.table(USAGE_TABLE).insert(rows).execute()
+            print(f"✓ Persisted {len(rows)} LLM usage rows")
+        except Exception as e:
+            print(f"⚠ Failed to persist LLM usage, keeping it for the next flush: {e}")
+            with self._lock:
+                for key, totals in pending.items():
+                    _add(self._pending.setdefault(key, _empty()), totals)
+
+    # ==================== BUDGETS ====================
+    def tokens_today(self, user_id: str) -> int:
+        """Tokens the user used today - persisted totals of all instances plus this process's unflushed usage"""
+        day = datetime.utcnow().date().isoformat()
+        with self._lock:
+            entry = self._daily_tokens.get((user_id, day))
+            if entry and time.monotonic() - entry[1] < self.flush_interval:
+                return entry[0]
+
+        used = 0
+        if supabase:
+            try:
+                rows = supabase.table(USAGE_TABLE)\
+                    .select("prompt_tokens, completion_tokens")\
+                    .eq("user_id", user_id)\
+                    .eq("day", day)\
+                    .execute()
+                used = sum((r["prompt_tokens"] or 0) + (r["completion_tokens"] or 0) for r in rows.data or [])
+            except Exception as e:
+                print(f"⚠ Failed to load token usage for {user_id}: {e}")
+
+        with self._lock:
+            # Plus what this process recorded but hasn't persisted yet
+            used += sum(t["prompt_tokens"] + t["completion_tokens"]
+                        for (d, u, _, _), t in self._pending.items() if u == user_id and d == day)
+            # Rows still in the write-behind buffer aren't in the table yet - never count down
+            entry = self._daily_tokens.get((user_id, day))
+            used = max(used, entry[0] if entry else 0)
+            self._daily_tokens[(user_id, day)] = [used, time.monotonic()]
+            return used
+
+    def remaining_budget(self, user_id: str, plan: str):
+        """Tokens left today for the user's plan, or None when the plan has no budget"""
+        budget = PLAN_TOKEN_BUDGETS.get(plan)
+        if not budget:
+            return None
+        return budget - self.tokens_today(user_id)
+
+    # ==================== SUMMARY ====================
+    def summary(self) -> dict:
+        """Today's totals recorded by this process"""
+        with self._lock:
+            rows = [{"day": d, "user_id": u, "kind": k, "model": m, **t} for (d, u, k, m), t in self._totals.items()]
+        return summarize(rows)
+
+
+def summarize(rows: list, top_users: int = 10) -> dict:
+    """Usage rows -> totals by model, by kind (with cost per audit) and the heaviest users"""
+    by_model, by_kind, by_user = {}, {}, {}
+    for row in rows:
+        delta = {key: type(default)(row.get(key) or 0) for key, default in _empty().items()}
+        if row.get("model"):
+            _add(by_model.setdefault(row["model"], _empty()), delta)
+        _add(by_kind.setdefault(row.get("kind") or "other", _empty()), delta)
+        if row.get("user_id"):
+            _add(by_user.setdefault(row["user_id"], _empty()), delta)
+
+    for totals in list(by_model.values()) + list(by_kind.values()) + list(by_user.values()):
+        totals["cost_usd"] = round(totals["cost_usd"], 6)
+        totals["latency_seconds"] = round(totals["latency_seconds"], 3)
+        totals["avg_latency"] = round(totals["latency_seconds"] / totals["calls"], 3) if totals["calls"] else None
+        totals["cost_per_audit"] = round(totals["cost_usd"] / totals["audits"], 6) if totals["audits"] else None
+
+    heaviest = sorted(by_user.items(), key=lambda item: -(item[1]["prompt_tokens"] + item[1]["completion_tokens"]))
+    return {
+        "by_model": by_model,
+        "by_kind": by_kind,
+        "top_users": [dict(totals, user_id=user_id) for user_id, totals in heaviest[:top_users]]
+    }
+
+
+def persisted_summary(days: int = 7) -> dict:
+    """Summary of the llm_usage rows of the last `days` days (all instances)"""
+    if not supabase:
+        raise Exception("Service not configured")
+
+    since = (datetime.utcnow().date() - timedelta(days=days - 1)).isoformat()
+    rows = []
+    offset = 0
+    while offset < SUMMARY_MAX_ROWS:
+        page = supabase.table(USAGE_TABLE)\
+            .select("user_id, kind, model, audits, calls, failures, prompt_tokens, completion_tokens, latency_seconds, cost_usd")\
+            .gte("day", since)\
+            .range(offset, offset + 999)\
+            .execute()
+        rows.extend(page.data or [])
+        if len(page.data or []) < 1000:
+            break
+        offset += 1000
+
+    summary = summarize(rows)
+    summary["since"] = since
+    summary["rows"] = len(rows)
+    return summary
+
+
+usage_tracker = UsageTracker()
+atexit.register(usage_tracker.flush)
@@ -0,0 +1,185 @@
+"""
+Write-behind buffer for append-only inserts (audit_history, llm_usage)
+Records are queued in memory and inserted in bulk by a background thread when a batch
+fills up or the flush interval passes, so the request path never waits on them.
+A failed bulk insert is retried row by row, so only the rows that fail themselves are
+retried (and dropped after max_retries); everything left is flushed on shutdown.
+Flush hooks see each batch once it's committed (e.g. to maintain rollups).
+Only used on the self-hosted server - see WRITE_BEHIND_ENABLED.
+"""
+import time
+import atexit
+import threading
+from app.config import WRITE_BEHIND_BATCH_SIZE, WRITE_BEHIND_FLUSH_INTERVAL, WRITE_BEHIND_MAX_RETRIES
+from app.database import supabase
+
+# Rows tried one by one after a bulk insert fails, before all failing means Supabase is down
+OUTAGE_PROBE_ROWS = 3
+
+
+class WriteBehindBuffer:
+
+    def __init__(self, batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+                 flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL,
+                 max_retries: int = WRITE_BEHIND_MAX_RETRIES):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._cond = threading.Condition()
+        self._pending = {}      # table -> list of records
+        self._inflight = {}     # table -> records taken by the flush that's running now
+        self._attempts = {}     # id(record) -> failed inserts of that queued record
+        self._flush_lock = threading.Lock()
+        self._hooks = {}        # table -> callbacks run with each committed batch
+        self._thread = None
+        self._stopping = False
+        self.flushed = 0
+        self.dropped = 0
+
+    # ==================== PRODUCER SIDE ====================
+    def enqueue(self, table: str, record: dict):
+        with self._cond:
+            self._pending.setdefault(table, []).append(record)
+            full = len(self._pending[table]) >= self.batch_size
+            self._ensure_thread()
+            if full:
+                self._cond.notify()
+
+    def on_flush(self, table: str, callback):
+        """Call callback(batch) after each batch of table is inserted"""
+        self._hooks.setdefault(table, []).append(callback)
+
+    def find(self, table: str, key: str, value):
+        """A record still waiting in the buffer (read-your-writes before the flush)"""
+        with self._cond:
+            for record in self._pending.get(table, []) + self._inflight.get(table, []):
+                if str(record.get(key)) == str(value):
+                    return dict(record)
+        return None
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "pending": {table: len(records) for table, records in self._pending.items()},
+                "flushed": self.flushed,
+                "dropped": self.dropped
+            }
+
+    # ==================== FLUSHING ====================
+    def flush(self):
+        """Insert everything that's queued, one bulk insert per table"""
+        with self._flush_lock:
+            with self._cond:
+                batches = {table: records for table, records in self._pending.items() if records}
+                self._pending = {}
+                self._inflight = batches
+
+            for table, records in batches.items():
+                for start in range(0, len(records), self.batch_size):
+                    self._insert_batch(table, records[start:start + self.batch_size])
+
+            with self._cond:
+                self._inflight = {}
+
+    def _insert_batch(self, table: str, batch: list):
+        if not supabase:
+            print(f"⚠ Supabase not configured - dropping {len(batch)} buffered {table} rows")
+            self.dropped += len(batch)
+            return
+
+        try:
+            supabase.table(table).insert(batch).execute()
+            self._committed(table, batch)
+            return
+        except Exception as e:
+            error = e
+
+        failed = batch
+        if len(batch) > 1:
+            # One bad row fails the whole bulk insert - find it instead of dropping everyone's rows
+            print(f"⚠ Bulk insert of {len(batch)} {table} rows failed, retrying row by row: {error}")
+            committed, failed = [], []
+            for index, record in enumerate(batch):
+                if not committed and len(failed) >= OUTAGE_PROBE_ROWS:
+                    # Every row fails - the database is the problem, not the data
+                    failed.extend(batch[index:])
+                    break
+                try:
+                    supabase.table(table).insert(record).execute()
+                    committed.append(record)
+                except Exception as e:
+                    failed.append(record)
+                    error = e
+            if committed:
+                self._committed(table, committed)
+
+        retry, dropped = [], 0
+        for record in failed:
+            attempts = self._attempts.pop(id(record), 0) + 1
+            if attempts >= self.max_retries:
+                dropped += 1
+            else:
+                self._attempts[id(record)] = attempts
+                retry.append(record)
+        if dropped:
+            self.dropped += dropped
+            print(f"❌ Dropping {dropped} {table} rows after {self.max_retries} failed inserts: {error}")
+        if retry:
+            print(f"⚠ {len(retry)} {table} rows failed to insert, will retry: {error}")
+            with self._cond:
+                # Back at the front so rows keep their order
+                self._pending[table] = retry + self._pending.get(table, [])
+
+    def _committed(self, table: str, records: list):
+        for record in records:
+            self._attempts.pop(id(record), None)
+        self.flushed += len(records)
+        print(f"✓ Flushed {len(records)} buffered rows into {table}")
+        self._run_hooks(table, records)
+
+    def _run_hooks(self, table: str, batch: list):
+        for callback in self._hooks.get(table, []):
+            try:
+                callback(batch)
+            except Exception as e:
+                # The rows are committed - a failing hook must not requeue them
+                print(f"⚠ Flush hook {getattr(callback, '__name__', callback)} failed for {table}: {e}")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopping:
+                    self._cond.wait(timeout=self.flush_interval)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def _ensure_thread(self):
+        # Caller holds self._cond
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def shutdown(self, timeout: float = 10.0):
+        """Stop the flusher and write out whatever is left, retrying failed batches"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+            if (thread is None or not thread.is_alive()) and not any(self._pending.values()):
+                return
+        if thread and thread.is_alive():
+            thread.join(timeout)
+
+        deadline = time.monotonic() + timeout
+        while any(self._pending.values()) and time.monotonic() < deadline:
+            self.flush()
+            if any(self._pending.values()):
+                time.sleep(0.5)
+        print(f"✓ Write-behind buffer drained ({self.flushed} flushed, {self.dropped} dropped)")
+
+
+write_buffer = WriteBehindBuffer()
+atexit.register(write_buffer.shutdown)
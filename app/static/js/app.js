@@ -7,9 +7,83 @@ window.addEventListener('load', function() {
     if (auditForm) {
         auditForm.addEventListener('submit', handleAuditSubmit);
         updateButtonState();
+        
+        // Live local SEO score while typing the title
+        if (auditForm.title) {
+            auditForm.title.addEventListener('input', scheduleTitleScore);
+        }
+        
+        // Open a saved audit from the dashboard (no credit spent)
+        const auditId = new URLSearchParams(window.location.search).get('audit_id');
+        if (auditId) {
+            loadSavedAudit(auditId);
+        }
     }
 });
 
+var titleScoreTimer = null;
+var titleScoreRequest = 0;
+
+function scheduleTitleScore() {
+    clearTimeout(titleScoreTimer);
+    titleScoreTimer = setTimeout(updateTitleScore, 150);
+}
+
+async function updateTitleScore() {
+    const form = document.getElementById('audit-form');
+    const scoreEl = document.getElementById('title-seo-score');
+    if (!form || !scoreEl) return;
+    
+    const title = form.title.value;
+    if (!title.trim()) {
+        scoreEl.classList.add('hidden');
+        return;
+    }
+    
+    const requestId = ++titleScoreRequest;
+    const params = new URLSearchParams({ title: title, description: form.description.value || '' });
+    
+    try {
+        const response = await fetch(`/api/seo/title-score?${params}`);
+        const data = await response.json();
+        if (requestId !== titleScoreRequest) return;  // A newer keystroke already won
+        
+        const color = data.score >= 75 ? 'text-green-600' : data.score >= 50 ? 'text-amber-600' : 'text-red-600';
+        const hint = data.issues.length ? ` • ${data.issues[0]}` : '';
+        scoreEl.className = `mt-1 text-sm ${color}`;
+        scoreEl.textContent = `SEO title score: ${data.score}/100 (${data.length}/${data.max_length} chars)${hint}`;
+    } catch (error) {
+        console.error('Title score failed:', error);
+    }
+}
+
+async function loadSavedAudit(auditId) {
+    const formError = document.getElementById('form-error');
+    const formErrorText = document.getElementById('form-error-text');
+    
+    try {
+        console.log('📂 Loading saved audit:', auditId);
+        
+        const response = await fetch(`/api/audits/${encodeURIComponent(auditId)}`);
+        const data = await response.json();
+        
+        if (response.ok) {
+            displayResults(data);
+            const resultsContainer = document.getElementById('results-container');
+            if (resultsContainer) {
+                resultsContainer.scrollIntoView({ behavior: 'smooth', block: 'start' });
+            }
+        } else {
+            if (formErrorText) formErrorText.textContent = data.error || 'Could not load this audit';
+            if (formError) formError.classList.remove('hidden');
+        }
+    } catch (error) {
+        console.error('❌ Failed to load saved audit:', error);
+        if (formErrorText) formErrorText.textContent = 'Network error. Please try again.';
+        if (formError) formError.classList.remove('hidden');
+    }
+}
+
 async function handleAuditSubmit(e) {
     e.preventDefault();
     
@@ -0,0 +1,70 @@
+"""
+Shared fixtures - everything runs offline: the LLM is MockLLMClient and Supabase a
+small in-memory fake that supports the insert calls the services make
+"""
+import pytest
+from app.services.mock_llm import MockLLMClient
+from app.services.model_router import ModelRouter
+from app.services import audit_service
+
+MODELS = ["model-a", "model-b", "model-c"]
+
+
+class FakeQuery:
+    def __init__(self, db, table, rows):
+        self._db = db
+        self._table = table
+        self._rows = rows if isinstance(rows, list) else [rows]
+
+    def execute(self):
+        self._db.inserts.append((self._table, len(self._rows)))
+        if self._db.down or any(row.get("bad") for row in self._rows):
+            raise Exception("insert failed (fake)")
+        self._db.tables.setdefault(self._table, []).extend(self._rows)
+        return self
+
+
+class FakeTable:
+    def __init__(self, db, name):
+        self._db = db
+        self._name = name
+
+    def insert(self, rows):
+        return FakeQuery(self._db, self._name, rows)
+
+
+class FakeSupabase:
+    """supabase.table(name).insert(rows).execute() - a row with "bad" set fails, down fails everything"""
+
+    def __init__(self):
+        self.tables = {}
+        self.inserts = []   # (table, rows in the call) per insert attempt
+        self.down = False
+
+    def table(self, name):
+        return FakeTable(self, name)
+
+
+@pytest.fixture
+def fake_supabase():
+    return FakeSupabase()
+
+
+@pytest.fixture
+def router(monkeypatch):
+    """A fresh router over three fake models, used by generate_json"""
+    router = ModelRouter(MODELS)
+    monkeypatch.setattr(audit_service, "model_router", router)
+    return router
+
+
+@pytest.fixture
+def mock_llm(monkeypatch):
+    """Install a MockLLMClient as the Groq client; call it with the per-model behaviour"""
+    monkeypatch.setattr(audit_service, "RETRY_PAUSE_SECONDS", 0)
+
+    def install(**behavior):
+        client = MockLLMClient(behavior=behavior, default_latency=0)
+        monkeypatch.setattr(audit_service, "groq_client", client)
+        return client
+    return install
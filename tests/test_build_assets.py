@@ -0,0 +1,64 @@
+import os
+import shutil
+import subprocess
+import pytest
+from app.assets import STATIC_DIR
+from app.build_assets import minify_js, minify_css
+
+TRICKY_JS = r"""
+// Line comment
+const url = "http://example.com/*not a comment*/";   // trailing comment
+const re = /\/\/[^/]*\/*/g;   /* block
+   comment */
+const ratio = 10 / 2 / 5;
+const path = url.replace(/[/]+/g, "/");
+const html = `<a href="${url}">${ items.map(i => { return `${i} // kept`; }).join("/") }</a>`;
+let total = 1
+total += 2
+console.log(url, re.source, ratio, path, html, total)
+"""
+
+
+def test_drops_comments_and_indentation():
+    minified = minify_js("function f() {\n    // comment\n    return 1; /* more */\n}\n\n\n")
+    assert minified == "function f() {\nreturn 1;\n}\n"
+
+
+def test_literals_are_untouched():
+    minified = minify_js(TRICKY_JS)
+    assert '"http://example.com/*not a comment*/"' in minified
+    assert r"/\/\/[^/]*\/*/g" in minified
+    assert "/[/]+/g" in minified
+    assert "`${i} // kept`" in minified
+    assert "Line comment" not in minified and "block" not in minified
+
+
+def test_division_is_not_a_regex():
+    assert "10 / 2 / 5" in minify_js("const ratio = 10 / 2 / 5; // half\n")
+
+
+def test_line_breaks_are_kept_for_asi():
+    assert "let total = 1\ntotal += 2\n" in minify_js(TRICKY_JS)
+
+
+def test_minify_css():
+    css = "/* theme */\n.card  >  a {\n  color : red;\n  margin: 0 ;\n}\n"
+    assert minify_css(css) == ".card>a{color : red;margin: 0}"
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_minified_js_behaves_the_same():
+    def run(source):
+        return subprocess.run(["node", "-e", "const items = [1, 2];\n" + source],
+                              capture_output=True, text=True, check=True).stdout
+    assert run(minify_js(TRICKY_JS)) == run(TRICKY_JS)
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_app_js_still_parses(tmp_path):
+    with open(os.path.join(STATIC_DIR, "js", "app.js"), encoding="utf-8") as f:
+        source = f.read()
+    minified = tmp_path / "app.min.js"
+    minified.write_text(minify_js(source), encoding="utf-8")
+    assert len(minified.read_text(encoding="utf-8")) < len(source)
+    subprocess.run(["node", "--check", str(minified)], check=True)
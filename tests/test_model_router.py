@@ -0,0 +1,154 @@
+import pytest
+from app.config import BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN_SECONDS
+from app.services.audit_service import generate_json, AIServiceError
+from app.services.model_router import ModelRouter, CLOSED, OPEN, HALF_OPEN, PROBE_WINDOW_SECONDS
+from tests.conftest import MODELS
+
+
+def _fail(router, model, times=BREAKER_FAILURE_THRESHOLD, kind="error"):
+    for _ in range(times):
+        router.record_failure(model, kind, 1.0)
+
+
+def _cool_down(router, model):
+    # As if the cooldown had passed
+    router._stats[model].opened_at -= router._stats[model].cooldown
+
+
+# ==================== ORDERING ====================
+def test_configured_order_without_samples():
+    assert ModelRouter(MODELS).ordered_models() == MODELS
+
+
+def test_faster_model_goes_first():
+    router = ModelRouter(MODELS)
+    router.record_success("model-a", 4.0)
+    router.record_success("model-b", 0.5)
+    router.record_success("model-c", 2.0)
+    assert router.ordered_models() == ["model-b", "model-c", "model-a"]
+
+
+def test_failures_make_a_fast_model_expensive():
+    router = ModelRouter(MODELS)
+    router.record_success("model-a", 0.5)
+    router.record_success("model-b", 1.0)
+    router.record_failure("model-a", "error", 0.1)
+    router.record_failure("model-a", "error", 0.1)
+    assert router.ordered_models()[0] == "model-b"
+
+
+def test_fast_errors_dont_count_as_latency():
+    router = ModelRouter(MODELS)
+    router.record_failure("model-a", "rate_limit", 0.01)
+    assert router.snapshot()[0]["ewma_latency"] > 0.01
+
+
+# ==================== CIRCUIT BREAKER ====================
+def test_breaker_opens_after_consecutive_failures():
+    router = ModelRouter(MODELS)
+    _fail(router, "model-a", BREAKER_FAILURE_THRESHOLD - 1)
+    assert "model-a" in router.ordered_models()
+
+    _fail(router, "model-a", 1)
+    assert router._stats["model-a"].state == OPEN
+    assert "model-a" not in router.ordered_models()
+
+
+def test_success_resets_the_failure_streak():
+    router = ModelRouter(MODELS)
+    _fail(router, "model-a", BREAKER_FAILURE_THRESHOLD - 1)
+    router.record_success("model-a", 1.0)
+    _fail(router, "model-a", BREAKER_FAILURE_THRESHOLD - 1)
+    assert router._stats["model-a"].state == CLOSED
+
+
+def test_half_open_lets_one_probe_through_first():
+    router = ModelRouter(MODELS)
+    _fail(router, "model-a")
+    _cool_down(router, "model-a")
+
+    assert router.ordered_models()[0] == "model-a"
+    assert router._stats["model-a"].state == HALF_OPEN
+    # Only one probe per window
+    assert "model-a" not in router.ordered_models()
+
+    router._stats["model-a"].probe_started -= PROBE_WINDOW_SECONDS
+    assert router.ordered_models()[0] == "model-a"
+
+
+def test_successful_probe_closes_the_breaker():
+    router = ModelRouter(MODELS)
+    _fail(router, "model-a")
+    _cool_down(router, "model-a")
+    router.ordered_models()
+
+    router.record_success("model-a", 1.0)
+    assert router._stats["model-a"].state == CLOSED
+    assert router._stats["model-a"].cooldown == BREAKER_COOLDOWN_SECONDS
+
+
+def test_failed_probe_reopens_with_a_longer_cooldown():
+    router = ModelRouter(MODELS)
+    _fail(router, "model-a")
+    _cool_down(router, "model-a")
+    router.ordered_models()
+
+    router.record_failure("model-a", "timeout", 1.0)
+    assert router._stats["model-a"].state == OPEN
+    assert router._stats["model-a"].cooldown == BREAKER_COOLDOWN_SECONDS * 2
+
+
+def test_deprecated_model_stays_out_for_long():
+    router = ModelRouter(MODELS)
+    router.record_failure("model-b", "deprecated")
+    assert router._stats["model-b"].state == OPEN
+    assert router._stats["model-b"].cooldown == BREAKER_COOLDOWN_SECONDS * 60
+
+
+def test_all_breakers_open_forces_the_soonest():
+    router = ModelRouter(MODELS)
+    for model in MODELS:
+        _fail(router, model)
+    router._stats["model-c"].opened_at -= 10
+    assert router.ordered_models() == ["model-c"]
+
+
+# ==================== ROUTING WITH THE MOCK PROVIDER ====================
+def test_falls_back_to_the_next_model(router, mock_llm):
+    client = mock_llm(**{"model-a": "timeout"})
+    result = generate_json("Audit this listing", ["overall_score", "detailed_scores"])
+
+    assert result["overall_score"] == 58
+    assert client.calls == ["model-a", "model-b"]
+    assert router.snapshot()[0]["failure_rates"]["timeout"] > 0
+
+
+def test_open_breaker_skips_the_model(router, mock_llm):
+    client = mock_llm(**{"model-a": "timeout"})
+    for _ in range(BREAKER_FAILURE_THRESHOLD):
+        generate_json("Audit this listing", ["overall_score"])
+    client.calls.clear()
+
+    generate_json("Audit this listing", ["overall_score"])
+    assert client.calls == ["model-b"]
+
+
+def test_transient_errors_are_retried_on_the_same_model(router, mock_llm):
+    client = mock_llm(**{"model-a": "rate_limit"})
+    generate_json("Audit this listing", ["overall_score"])
+    assert client.calls == ["model-a", "model-a", "model-b"]
+
+
+def test_truncated_output_falls_back(router, mock_llm):
+    client = mock_llm(**{"model-a": "truncate"})
+    result = generate_json("Audit this listing", ["overall_score", "detailed_scores"])
+
+    assert "detailed_scores" in result
+    assert client.calls == ["model-a", "model-b"]
+    assert router._stats["model-a"].consecutive_failures == 1
+
+
+def test_every_model_failing_raises(router, mock_llm):
+    mock_llm(**{model: "error" for model in MODELS})
+    with pytest.raises(AIServiceError):
+        generate_json("Audit this listing", ["overall_score"])
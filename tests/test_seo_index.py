@@ -0,0 +1,81 @@
+import re
+from app.services.seo_index import KeywordMatcher, KEYWORDS, MATCHER, TITLE_MAX_LENGTH, score_title, \
+    validate_titles, _keywords_in, _normalize
+
+
+def _naive_find(text: str) -> list:
+    matches = []
+    for keyword in KEYWORDS:
+        for match in re.finditer(rf"(?<![a-z0-9]){re.escape(keyword)}(?![a-z0-9])", text):
+            matches.append((match.start(), keyword))
+    return sorted(matches)
+
+
+# ==================== MATCHER ====================
+def test_finds_overlapping_keywords():
+    matcher = KeywordMatcher(["hot tub", "tub", "hot", "tub view"])
+    assert sorted(matcher.find("hot tub view")) == [(0, "hot"), (0, "hot tub"), (4, "tub"), (4, "tub view")]
+
+
+def test_failure_links_recover_mid_match():
+    # After "big hot" the scan has to fall back to the "hot" prefix to find "hot tub"
+    matcher = KeywordMatcher(["big hot", "hot tub"])
+    assert sorted(matcher.find("big hot tub")) == [(0, "big hot"), (4, "hot tub")]
+
+
+def test_whole_words_only():
+    assert MATCHER.find("whirlpool") == []
+    assert (0, "pool") in MATCHER.find("pool")
+    assert MATCHER.find("lakefronts") == []
+
+
+def test_matches_a_naive_scan():
+    texts = [
+        "cozy cabin with hot tub and mountain view near ski-in lifts",
+        "modern downtown loft walk to beach free parking fast wifi",
+        "private pool villa beachfront family-friendly sleeps 8",
+        "",
+    ]
+    for text in texts:
+        assert sorted(MATCHER.find(text)) == _naive_find(text)
+
+
+def test_longest_match_wins():
+    found = _keywords_in(_normalize("Private Pool Villa with Hot Tub"))
+    assert "private pool" in found and "hot tub" in found
+    assert "pool" not in found and "private" not in found
+
+
+# ==================== SCORING ====================
+def test_keyword_rich_title_beats_a_generic_one():
+    good = score_title("Lakefront Cabin | Hot Tub, Sauna & Fireplace")
+    generic = score_title("A nice place to stay for your trip")
+    assert good["score"] > generic["score"]
+    assert good["front_loaded"]
+    assert good["keywords_found"][:2] == ["lakefront", "cabin"]
+    assert "No high-value search keywords in the title" in generic["issues"]
+
+
+def test_over_long_title_is_flagged():
+    result = score_title("Stunning Oceanfront Penthouse with Private Pool, Rooftop and Sauna")
+    assert result["length"] > TITLE_MAX_LENGTH
+    assert result["score"] <= 75
+    assert any("cuts it off" in issue for issue in result["issues"])
+
+
+def test_short_and_all_caps_titles_are_capped():
+    assert score_title("Cabin")["score"] <= 20
+    caps = score_title("LAKEFRONT CABIN WITH HOT TUB AND SAUNA")
+    assert "Avoid ALL CAPS titles" in caps["issues"]
+
+
+def test_suggests_description_keywords_missing_from_the_title():
+    result = score_title("Cozy Cabin in the Woods for a Weekend",
+                         "Relax in the hot tub, then walk to the lake. Fast wifi and a fireplace.")
+    assert "hot tub" in result["suggested_keywords"]
+    assert "cabin" not in result["suggested_keywords"]
+
+
+def test_validate_titles_skips_non_strings():
+    scores = validate_titles({"seo_focused": "Lakefront Cabin | Hot Tub", "broken": None})
+    assert list(scores) == ["seo_focused"]
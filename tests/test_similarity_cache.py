@@ -0,0 +1,78 @@
+from app.services.similarity_cache import SimilarityCache, shingles, minhash, similarity, NUM_HASHES
+
+TITLE = "Cozy lakefront cabin with hot tub"
+DESCRIPTION = ("Wake up to views of the lake from this quiet cabin. Relax in the private hot tub, "
+               "cook in the full kitchen and warm up by the wood fireplace after a day on the trails.")
+
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b)
+
+
+# ==================== MINHASH ====================
+def test_signatures_are_stable():
+    tokens = shingles(TITLE, DESCRIPTION, "wifi, hot tub")
+    assert minhash(tokens) == minhash(set(tokens))
+    assert len(minhash(tokens)) == NUM_HASHES
+
+
+def test_similarity_estimates_jaccard():
+    a = {f"token {i}" for i in range(200)}
+    for overlap in (0, 50, 100, 150, 200):
+        b = {f"token {i}" for i in range(200 - overlap, 400 - overlap)}
+        estimate = similarity(minhash(a), minhash(b))
+        assert abs(estimate - _jaccard(a, b)) < 0.2
+
+
+def test_shingles_ignore_case_and_punctuation():
+    assert shingles("Cozy Cabin!", "Hot tub, lake.") == shingles("cozy cabin", "hot tub lake")
+    assert "amenity:hot tub" in shingles(TITLE, DESCRIPTION, "Hot Tub, ")
+
+
+# ==================== CACHE ====================
+def _cache(**kwargs):
+    cache = SimilarityCache(**{"max_entries": 10, "ttl": 3600, "threshold": 0.85, **kwargs})
+    cache.store(TITLE, DESCRIPTION, "Cabin", "Couples", {"overall_score": 61}, "wifi, hot tub")
+    return cache
+
+
+def test_trivial_edit_is_a_hit():
+    cache = _cache()
+    found = cache.lookup(TITLE + "!", DESCRIPTION.replace("quiet", "Quiet"), "Cabin", "Couples", "wifi, hot tub")
+    assert found is not None
+    result, score = found
+    assert result == {"overall_score": 61} and score >= 0.85
+    assert cache.stats()["hits"] == 1
+
+
+def test_different_listing_is_a_miss():
+    cache = _cache()
+    assert cache.lookup("Modern downtown loft", "Steps from the metro, fast wifi and a workspace.",
+                        "Cabin", "Couples") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_scoped_by_property_type_and_audience():
+    cache = _cache()
+    assert cache.lookup(TITLE, DESCRIPTION, "Cabin", "Families", "wifi, hot tub") is None
+    assert cache.lookup(TITLE, DESCRIPTION, "Apartment", "Couples", "wifi, hot tub") is None
+
+
+def test_expired_entries_are_not_served():
+    cache = _cache(ttl=-1)
+    assert cache.lookup(TITLE, DESCRIPTION, "Cabin", "Couples", "wifi, hot tub") is None
+
+
+def test_lru_eviction_cleans_up_buckets():
+    cache = _cache(max_entries=2)
+    cache.store("Downtown loft", "Steps from the metro with fast wifi.", "Apartment", "Business", {"n": 2})
+    cache.lookup(TITLE, DESCRIPTION, "Cabin", "Couples", "wifi, hot tub")   # the cabin is now most recent
+    cache.store("Beachfront villa", "Private pool and ocean views.", "Villa", "Families", {"n": 3})
+
+    assert cache.stats()["entries"] == 2
+    assert cache.lookup("Downtown loft", "Steps from the metro with fast wifi.", "Apartment", "Business") is None
+    assert cache.lookup(TITLE, DESCRIPTION, "Cabin", "Couples", "wifi, hot tub") is not None
+
+    cache.max_entries = 0
+    cache._evict()
+    assert cache._buckets == {}
@@ -0,0 +1,89 @@
+import pytest
+from app.services import write_buffer as write_buffer_module
+from app.services.write_buffer import WriteBehindBuffer, OUTAGE_PROBE_ROWS
+
+
+@pytest.fixture
+def buffer(monkeypatch, fake_supabase):
+    monkeypatch.setattr(write_buffer_module, "supabase", fake_supabase)
+    buffer = WriteBehindBuffer(batch_size=100, flush_interval=3600, max_retries=2)
+    yield buffer
+    buffer._pending = {}
+    buffer.shutdown(timeout=0)
+
+
+def _rows(count, bad=()):
+    return [{"n": i, "bad": i in bad} for i in range(count)]
+
+
+def test_batch_goes_out_in_one_insert(buffer, fake_supabase):
+    committed = []
+    buffer.on_flush("audit_history", committed.extend)
+    for row in _rows(5):
+        buffer.enqueue("audit_history", row)
+    buffer.flush()
+
+    assert fake_supabase.inserts == [("audit_history", 5)]
+    assert [row["n"] for row in committed] == [0, 1, 2, 3, 4]
+    assert buffer.stats() == {"pending": {}, "flushed": 5, "dropped": 0}
+
+
+def test_bad_row_only_holds_back_itself(buffer, fake_supabase):
+    committed = []
+    buffer.on_flush("audit_history", committed.extend)
+    for row in _rows(6, bad={2}):
+        buffer.enqueue("audit_history", row)
+    buffer.flush()
+
+    assert [row["n"] for row in fake_supabase.tables["audit_history"]] == [0, 1, 3, 4, 5]
+    assert [row["n"] for row in committed] == [0, 1, 3, 4, 5]
+    assert [row["n"] for row in buffer._pending["audit_history"]] == [2]
+
+    # Retried with the next flush, dropped once it used up max_retries
+    buffer.flush()
+    assert buffer.stats() == {"pending": {}, "flushed": 5, "dropped": 1}
+    assert buffer._attempts == {}
+
+
+def test_attempts_are_counted_per_row(buffer, fake_supabase):
+    bad, good = _rows(2, bad={0})
+    buffer.enqueue("audit_history", bad)
+    buffer.enqueue("audit_history", good)
+    buffer.flush()                      # bad: 1st failure
+    buffer.enqueue("audit_history", {"n": 9, "bad": False})
+    fake_supabase.down = True
+    buffer.flush()                      # bad: 2nd failure -> dropped, the new row only fails once
+    fake_supabase.down = False
+
+    assert buffer.dropped == 1
+    assert [row["n"] for row in buffer._pending["audit_history"]] == [9]
+    buffer.flush()
+    assert [row["n"] for row in fake_supabase.tables["audit_history"]] == [1, 9]
+
+
+def test_outage_requeues_without_trying_every_row(buffer, fake_supabase):
+    fake_supabase.down = True
+    for row in _rows(50):
+        buffer.enqueue("llm_usage", row)
+    buffer.flush()
+
+    # One bulk insert plus a few single-row probes, not 50 round-trips
+    assert len(fake_supabase.inserts) == 1 + OUTAGE_PROBE_ROWS
+    assert [row["n"] for row in buffer._pending["llm_usage"]] == list(range(50))
+    assert buffer.dropped == 0
+
+
+def test_failing_hook_does_not_requeue(buffer, fake_supabase):
+    def broken_hook(rows):
+        raise Exception("rollup failed")
+    buffer.on_flush("audit_history", broken_hook)
+    buffer.enqueue("audit_history", {"n": 1})
+    buffer.flush()
+
+    assert buffer.stats() == {"pending": {}, "flushed": 1, "dropped": 0}
+
+
+def test_find_sees_rows_not_flushed_yet(buffer):
+    buffer.enqueue("audit_history", {"id": "a1", "n": 1})
+    assert buffer.find("audit_history", "id", "a1") == {"id": "a1", "n": 1}
+    assert buffer.find("audit_history", "id", "missing") is None